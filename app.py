@@ -1,10 +1,12 @@
+import json
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from hiring_agent import evaluate_candidate, load_history, load_agentfacts, generate_report_txt
-from utils import extract_text_from_pdf, sanitize_text, extract_skills, DEFAULT_SKILLS
+from hiring_agent import evaluate_candidate, evaluate_candidates, load_agentfacts, query_history, history_stats, history_signature, agentfacts_signature, generate_report_txt, get_inclusion_proof, verify_inclusion_proof, query_skills, skill_vocabulary, tail_logs, tail_history
+from utils import ingest_resumes, scrub_pii, extract_skills, DEFAULT_SKILLS
+from audit import verify_agentfacts_isolated
 
 # ======================== PAGE CONFIG ========================
 st.set_page_config(
@@ -276,6 +278,46 @@ CSS = """
 
 st.markdown(CSS, unsafe_allow_html=True)
 
+# ======================== CACHED LOADERS ========================
+# Keyed on the files' (path, inode, mtime, size), so reruns on unchanged data skip
+# disk reads and parsing, and any write by the agent invalidates the entry.
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_agentfacts(signature):
+    return load_agentfacts()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_skill_vocabulary(signature):
+    return skill_vocabulary()
+
+
+def _skill_filter_ids(must_have, exclude):
+    return query_skills(all_of=list(must_have), none_of=list(exclude)) if (must_have or exclude) else None
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_history_stats(signature, decision=None, must_have=(), exclude=()):
+    return history_stats(decision=decision, ids=_skill_filter_ids(must_have, exclude))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_history_page(signature, decision, must_have, exclude, ascending, limit, offset):
+    rows = query_history(
+        decision=decision, sort_by="total_score", ascending=ascending,
+        ids=_skill_filter_ids(must_have, exclude), limit=limit, offset=offset,
+    )
+    df = pd.DataFrame(rows, columns=['name', 'timestamp', 'total_score', 'decision', 'skill_match_percent'])
+    df['date'] = df['timestamp'].apply(lambda t: datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M'))
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_tail_history(signature, n):
+    # newest first; only the end of the history file is read
+    return tail_history(n)[::-1]
+
+
 # ======================== HEADER ========================
 header_col1, header_col2 = st.columns([1, 4])
 
@@ -330,7 +372,7 @@ with st.sidebar:
         <div style='background: rgba(16, 185, 129, 0.1); border-radius: 10px; padding: 16px; margin-top: 12px;'>
             <h4 style='margin: 0 0 8px 0; color: #10B981;'>🔒 Trust & Safety</h4>
             <ul style='margin: 0; padding-left: 16px; font-size: 13px; color: #E0E7FF;'>
-                <li>⚠️ Name & personal data removed before scoring</li>
+                <li>⚠️ Name & personal data (emails, phones, URLs, dates) removed before scoring</li>
                 <li>🔐 All decisions cryptographically signed</li>
                 <li>📝 Complete activity logs maintained</li>
                 <li>✅ Bias checks enforced</li>
@@ -419,7 +461,7 @@ if page == "📋 Evaluate Candidate":
             evaluate_btn = st.button("🚀 Evaluate Candidate", use_container_width=True)
         with col_btn2:
             st.markdown(
-                '<div class="muted small" style="margin-top: 12px;">🔒 <strong>Privacy:</strong> Name, gender, age, address are removed before scoring to prevent bias.</div>',
+                '<div class="muted small" style="margin-top: 12px;">🔒 <strong>Privacy:</strong> Name, gender, age and address lines are removed, and emails, phone numbers, URLs and dates are redacted before scoring to prevent bias.</div>',
                 unsafe_allow_html=True,
             )
     
@@ -427,15 +469,20 @@ if page == "📋 Evaluate Candidate":
     if evaluate_btn:
         # Obtain resume text
         resume_text = ""
+        extraction = None
+        redactions = None
         if resume_file is not None:
-            if resume_file.type == "application/pdf":
-                resume_text = extract_text_from_pdf(resume_file)
-            else:
-                try:
-                    resume_text = resume_file.getvalue().decode("utf-8")
-                except Exception:
-                    resume_text = str(resume_file.getvalue())
+            ingested = ingest_resumes([(resume_file.name, resume_file.getvalue())])[0]
+            resume_text = ingested["text"]
+            extraction = ingested["extraction"]
+            redactions = ingested["redactions"]
+            if ingested["error"]:
+                st.warning(f"⚠️ Could not fully read {resume_file.name}: {ingested['error']['message']}")
+            elif extraction["truncated"]:
+                st.warning(f"⚠️ {resume_file.name} was truncated ({extraction['truncated'].replace('_', ' ')} limit); only the first part was evaluated.")
         if paste and not resume_text:
+            extraction = None
+            redactions = None
             resume_text = paste
 
         if not resume_text:
@@ -446,7 +493,8 @@ if page == "📋 Evaluate Candidate":
             st.error("❌ Please enter candidate name")
         else:
             with st.spinner("⏳ Processing evaluation..."):
-                resume_text = sanitize_text(resume_text)
+                resume_text, scrubbed = scrub_pii(resume_text)
+                redactions = redactions or scrubbed
 
                 # Extracted skills
                 extracted = extract_skills(resume_text, DEFAULT_SKILLS)
@@ -462,6 +510,8 @@ if page == "📋 Evaluate Candidate":
                     "years_experience": years_experience if years_experience > 0 else None,
                     "projects": projects,
                     "job_description": job_description,
+                    "extraction": extraction,
+                    "redactions": redactions,
                 }
 
                 out = evaluate_candidate(payload)
@@ -620,7 +670,7 @@ if page == "📋 Evaluate Candidate":
             # Download Report
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown("<h3>📥 Download Report</h3>", unsafe_allow_html=True)
-            txt = generate_report_txt(record, agentfacts)
+            txt = generate_report_txt(record, agentfacts, include_proof=True)
             st.download_button(
                 label="📄 Download as Text (.txt)",
                 data=txt,
@@ -634,7 +684,7 @@ if page == "📋 Evaluate Candidate":
 elif page == "🔄 Compare Candidates":
     st.markdown("<h2>🔄 Compare Candidates</h2>", unsafe_allow_html=True)
     st.markdown(
-        '<p class="muted">Upload 2–5 resumes to compare scores side-by-side and identify top performers.</p>',
+        '<p class="muted">Upload two or more resumes to compare scores side-by-side and identify top performers.</p>',
         unsafe_allow_html=True,
     )
     
@@ -648,33 +698,28 @@ elif page == "🔄 Compare Candidates":
     st.markdown('</div>', unsafe_allow_html=True)
     
     if uploaded:
-        if len(uploaded) > 5:
-            st.warning("⚠️ Maximum 5 resumes allowed. Only the first 5 will be evaluated.")
-            uploaded = uploaded[:5]
-        
         with st.spinner("⏳ Processing resumes..."):
-            items = []
-            for f in uploaded:
-                text = ""
-                if f.type == "application/pdf":
-                    text = extract_text_from_pdf(f)
-                else:
-                    try:
-                        text = f.getvalue().decode("utf-8")
-                    except Exception:
-                        text = str(f.getvalue())
+            ingested = ingest_resumes([(f.name, f.getvalue()) for f in uploaded])
+            payloads = []
+            for f, res in zip(uploaded, ingested):
+                if res["error"]:
+                    st.warning(f"⚠️ Could not read {f.name}: {res['error']['message']}")
+                elif res["extraction"]["truncated"]:
+                    st.warning(f"⚠️ {f.name} was truncated ({res['extraction']['truncated'].replace('_', ' ')} limit).")
                 
-                text = sanitize_text(text)
+                text = res["text"]
                 skills_found = extract_skills(text, DEFAULT_SKILLS)
                 
                 payload = {
                     "name": f.name.replace(".pdf", "").replace(".txt", ""),
                     "resume_text": text,
                     "skills_text": ", ".join(skills_found),
+                    "extraction": res["extraction"],
+                    "redactions": res["redactions"],
                 }
-                out = evaluate_candidate(payload)
-                rec = out["record"]
-                items.append(rec)
+                payloads.append(payload)
+            
+            items = evaluate_candidates(payloads)["records"]
             
             if items:
                 st.markdown("---")
@@ -782,15 +827,23 @@ elif page == "📊 History Dashboard":
         unsafe_allow_html=True,
     )
     
-    history = load_history()
+    signature = history_signature()
     
-    if not history:
+    if not cached_history_stats(signature)['count']:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.info("📭 No evaluations yet. Start by evaluating a candidate!")
         st.markdown('</div>', unsafe_allow_html=True)
     else:
-        df = pd.DataFrame(history)
-        df['date'] = df['timestamp'].apply(lambda t: datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M'))
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown("<h3>🕒 Latest Evaluations</h3>", unsafe_allow_html=True)
+        for rec in cached_tail_history(signature, 5):
+            icon = "✅" if rec.get('decision') == "Shortlist" else "❌"
+            when = datetime.fromtimestamp(rec.get('timestamp', 0)).strftime('%Y-%m-%d %H:%M')
+            st.markdown(
+                f"<div>{icon} <strong>{rec.get('name')}</strong> — {rec.get('total_score', 0):.1f}/100 <span class='muted'>({when})</span></div>",
+                unsafe_allow_html=True,
+            )
+        st.markdown('</div>', unsafe_allow_html=True)
         
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("<h3>🔍 Filters</h3>", unsafe_allow_html=True)
@@ -807,20 +860,46 @@ elif page == "📊 History Dashboard":
         with filter_col2:
             sort_asc = st.checkbox("Sort by score (ascending)", value=False)
         
-        # Apply filters
-        if decision_filter != "All":
-            df = df[df['decision'] == decision_filter]
+        skill_col1, skill_col2 = st.columns(2)
+        vocabulary = cached_skill_vocabulary(signature)
         
-        df = df.sort_values('total_score', ascending=sort_asc)
+        with skill_col1:
+            must_have = st.multiselect("Has all skills:", vocabulary)
+        
+        with skill_col2:
+            exclude = st.multiselect("Has none of:", vocabulary)
+        
+        # Apply filters (pushed down to the history store)
+        selected_decision = None if decision_filter == "All" else decision_filter
+        must_have, exclude = tuple(must_have), tuple(exclude)
+        stats = cached_history_stats(signature, selected_decision, must_have, exclude)
+        
+        # Pagination: only the current page is fetched and rendered
+        page_col1, page_col2 = st.columns(2)
+        
+        with page_col1:
+            page_size = st.selectbox("Rows per page:", [10, 25, 50, 100], index=1)
+        
+        page_count = max((stats['count'] + page_size - 1) // page_size, 1)
+        if st.session_state.get('history_page', 1) > page_count:
+            st.session_state['history_page'] = page_count
+        
+        with page_col2:
+            page = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, step=1, key='history_page')
+        
+        offset = (int(page) - 1) * page_size
+        df = cached_history_page(signature, selected_decision, must_have, exclude, sort_asc, page_size, offset)
         
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Display Table
         st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown(f"<h3>📋 Evaluations ({len(df)})</h3>", unsafe_allow_html=True)
+        st.markdown(f"<h3>📋 Evaluations ({stats['count']})</h3>", unsafe_allow_html=True)
+        if stats['count']:
+            st.markdown(f"<p class='muted'>Showing {offset + 1}–{offset + len(df)} of {stats['count']}</p>", unsafe_allow_html=True)
         
         # Custom table display
-        for idx, (_, row) in enumerate(df.iterrows(), 1):
+        for idx, (_, row) in enumerate(df.iterrows(), offset + 1):
             score = row['total_score']
             decision = row['decision']
             
@@ -864,38 +943,36 @@ elif page == "📊 History Dashboard":
                 f"""
                 <div class="metric-card">
                     <div class="metric-label">Total Evaluated</div>
-                    <div class="metric-value">{len(df)}</div>
+                    <div class="metric-value">{stats['count']}</div>
                 </div>
                 """,
                 unsafe_allow_html=True,
             )
         
         with stats_col2:
-            shortlist_count = len(df[df['decision'] == 'Shortlist'])
             st.markdown(
                 f"""
                 <div class="metric-card">
                     <div class="metric-label">Shortlisted</div>
-                    <div class="metric-value" style="color: #10B981;">{shortlist_count}</div>
+                    <div class="metric-value" style="color: #10B981;">{stats['shortlisted']}</div>
                 </div>
                 """,
                 unsafe_allow_html=True,
             )
         
         with stats_col3:
-            reject_count = len(df[df['decision'] == 'Reject'])
             st.markdown(
                 f"""
                 <div class="metric-card">
                     <div class="metric-label">Rejected</div>
-                    <div class="metric-value" style="color: #EF4444;">{reject_count}</div>
+                    <div class="metric-value" style="color: #EF4444;">{stats['rejected']}</div>
                 </div>
                 """,
                 unsafe_allow_html=True,
             )
         
         with stats_col4:
-            avg_score = df['total_score'].mean()
+            avg_score = stats['avg_score'] or 0.0
             st.markdown(
                 f"""
                 <div class="metric-card">
@@ -916,7 +993,7 @@ elif page == "✅ Verification":
         unsafe_allow_html=True,
     )
     
-    agentfacts = load_agentfacts()
+    agentfacts = cached_agentfacts(agentfacts_signature())
     
     if not agentfacts:
         st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -964,7 +1041,7 @@ elif page == "✅ Verification":
         policy_details = {
             'bias_check': {
                 'label': 'Bias Check',
-                'description': 'Name, gender, age, address removed before scoring',
+                'description': 'Name, gender, age, address removed; emails, phones, URLs, dates redacted before scoring',
                 'icon': '⚠️'
             },
             'data_sanitization': {
@@ -1045,13 +1122,72 @@ elif page == "✅ Verification":
         
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # Inclusion Proof
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown("<h3>🔎 Inclusion Proof</h3>", unsafe_allow_html=True)
+        
+        record_id = st.text_input(
+            "Record ID",
+            value=agentfacts.get('last_evaluation', {}).get('id', ''),
+            placeholder="Evaluation record id",
+        )
+        if record_id:
+            proof = get_inclusion_proof(record_id.strip(), agentfacts)
+            if not proof:
+                st.warning("⚠️ No activity log entry found for this record id.")
+            else:
+                if verify_inclusion_proof(proof):
+                    where = f"segment {proof['segment']}, " if 'segment' in proof else ""
+                    st.success(f"✓ Record is covered by the signed Merkle root ({where}leaf {proof['index']} of {proof['leaf_count']}, {len(proof['path'])} hashes).")
+                else:
+                    st.error("✗ Proof does not match the signed Merkle root.")
+                with st.expander("🧾 Audit Path"):
+                    st.json(proof)
+                st.download_button(
+                    label="📄 Download Proof (.json)",
+                    data=json.dumps(proof, indent=2),
+                    file_name=f"proof_{proof['record_id'][:8]}.json",
+                    mime="application/json",
+                    use_container_width=True,
+                )
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Full Audit
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown("<h3>🧪 Full Audit</h3>", unsafe_allow_html=True)
+        st.markdown(
+            '<p class="muted">Recompute every segment root, the checkpoint chain, the signed Merkle root and the HMAC, and cross-check each log entry against its history record.</p>',
+            unsafe_allow_html=True,
+        )
+        if st.button("🔍 Run Full Audit", use_container_width=True):
+            try:
+                with st.spinner("Auditing..."):
+                    # out of process: the audit's worker pool must not re-run this script
+                    report = verify_agentfacts_isolated()
+            except RuntimeError as e:
+                st.error(f"✗ Audit could not run: {e}")
+            else:
+                if report['ok']:
+                    st.success(f"✓ Audit passed: {report['log_entries']} log entries and {report['history_records']} history records checked in {report['seconds']}s.")
+                else:
+                    first, first_history = report['first_divergence'], report['first_history_divergence']
+                    where = f" First divergence at log position {first['position']} ({first['kind']})." if first else ""
+                    if first_history:
+                        where += f" First divergence at history record {first_history['position']} ({first_history['kind']})."
+                    st.error(f"✗ Audit failed with {len(report['issues'])} issue(s).{where}")
+                with st.expander("🧾 Audit Report"):
+                    st.json(report)
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+        
         # Activity Logs
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("<h3>📋 Activity Logs (Latest 20)</h3>", unsafe_allow_html=True)
         
-        logs = agentfacts.get('logs', [])
+        logs = tail_logs(20, agentfacts)
         if logs:
-            for log in logs[-20:][::-1]:
+            for log in logs[::-1]:
                 ts = log.get('ts', 'N/A')
                 action = log.get('action', 'unknown')
                 details = log.get('details', {})
@@ -0,0 +1,510 @@
+"""
+Full audit of the signed evaluation store.
+
+    python audit.py [--workers N] [--json]
+    python audit.py --chain [--checkpoint chain.checkpoint.json]
+
+verify_agentfacts() recomputes what agentfacts.json vouches for instead of
+displaying the stored values:
+
+  - every sealed segment's Merkle root, against its checkpoint
+  - the checkpoint chain, link by link
+  - the signed merkle_root over the chain head, active log and policy checks
+  - the HMAC signature over that root, with secret.key
+  - every activity log entry against the history record written with it
+    (same position, same id, decision and score)
+  - every history record's own HMAC (verify_history_signatures() runs
+    just this check)
+  - the prev_hash chain through the history (verify_history_chain() runs
+    just this check, optionally resuming from a checkpoint)
+
+Sealed segments are hashed and the history is parsed in a process pool, so
+the wall time scales down with the core count. Workers are started with
+spawn, never forked from a threaded caller; a caller whose __main__ is not a
+real script (the Streamlit app) runs the audit through
+verify_agentfacts_isolated() instead. The report lists every issue found (up
+to MAX_ISSUES) and names the first divergent log position and, separately,
+the first divergent history position.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import hiring_agent
+from hiring_agent import CHAIN_GENESIS
+from utils import merkle_root, safe_load_json, safe_save_json, ensure_secret_key, verify_record, record_hash
+
+MAX_ISSUES = 100
+# history is handed to workers in ranges of about this many bytes (JSONL) or rows (SQLite)
+HISTORY_CHUNK_BYTES = 8 * 1024 * 1024
+HISTORY_CHUNK_ROWS = 20000
+# issue kinds whose position is a history record index; the others index the activity log
+HISTORY_ISSUES = frozenset({"record_signature", "record_chain", "history_unlogged"})
+
+
+def _entry_key(entry: Dict) -> Tuple:
+    details = entry.get("details", {})
+    return (details.get("id"), details.get("decision"), details.get("score"))
+
+
+def _record_key(record: Dict) -> Tuple:
+    return (record.get("id"), record.get("decision"), record.get("total_score"))
+
+
+# ---- worker tasks (module level so they pickle) ----
+
+def _segment_digest(path: str) -> Dict:
+    # recompute one sealed segment's root and collect its entry keys
+    segment = safe_load_json(path, default=None)
+    if not isinstance(segment, dict):
+        return {"error": "missing or unreadable"}
+    logs = segment.get("logs", [])
+    return {
+        "error": None,
+        "root": merkle_root(logs),
+        "stored_root": segment.get("merkle_root"),
+        "prev_chain": segment.get("prev_chain"),
+        "chain": segment.get("chain"),
+        "keys": [_entry_key(e) for e in logs],
+    }
+
+
+def _history_part(part: Tuple, key: bytes) -> Dict:
+    # ("jsonl", path, start byte, end byte) or ("sqlite", path, first seq, end seq):
+    # entry keys, records whose own signature fails (skipped without a key),
+    # and the prev_hash links inside the range (links between ranges: _Chain)
+    records, last_offset = _history_records(*part)
+    invalid, unsigned, breaks = [], 0, []
+    leading_unchained, chained, first_hash, last_hash = 0, False, None, None
+    for i, record in enumerate(records):
+        if key is None:
+            pass
+        elif not record.get("signature"):
+            # written before records were signed
+            unsigned += 1
+        elif not verify_record(record, key):
+            invalid.append(i)
+        prev = record.get("prev_hash")
+        if prev is None:
+            # written before records were chained; once the chain has started, a gap
+            if chained:
+                breaks.append(i)
+            else:
+                leading_unchained += 1
+        else:
+            if i and prev != last_hash:
+                breaks.append(i)
+            chained = True
+        last_hash = record_hash(record)
+        if not i:
+            first_hash = last_hash
+    return {
+        "keys": [_record_key(r) for r in records],
+        "invalid": invalid,
+        "unsigned": unsigned,
+        "breaks": breaks,
+        "leading_unchained": leading_unchained,
+        "first_prev": records[0].get("prev_hash") if records else None,
+        "first_hash": first_hash,
+        "last_hash": last_hash,
+        "last_offset": last_offset,
+    }
+
+
+def _history_records(kind: str, path: str, start: int, end: int) -> Tuple[List[Dict], int]:
+    # records in the range, and where the last one starts (byte offset or seq)
+    if kind == "sqlite":
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            rows = conn.execute("SELECT seq, record FROM history WHERE seq >= ? AND seq < ? ORDER BY seq",
+                                (start, end)).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(r[1]) for r in rows], (rows[-1][0] if rows else None)
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines, starts, pos = [], [], start
+    for line in data.split(b"\n"):
+        if line.strip():
+            lines.append(line)
+            starts.append(pos)
+        pos += len(line) + 1
+    try:
+        # one decoder call for the whole range instead of one per line
+        return json.loads(b"[" + b",".join(lines) + b"]"), (starts[-1] if starts else None)
+    except ValueError:
+        pass
+    # a torn line somewhere: fall back to per-line parsing, skipping it as utils.iter_jsonl does
+    records, last_offset = [], None
+    for line, offset in zip(lines, starts):
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+        last_offset = offset
+    return records, last_offset
+
+
+def _history_parts(start: int = None) -> List[Tuple]:
+    # work ranges covering the history from `start` (a line's byte offset, or a seq) to the end
+    if hiring_agent._use_sqlite():
+        with hiring_agent._history_db() as conn:
+            low, high = conn.execute("SELECT MIN(seq), MAX(seq) FROM history").fetchone()
+        if low is None:
+            return []
+        low = max(low, start or 0)
+        path = str(hiring_agent.HISTORY_DB_PATH)
+        return [("sqlite", path, lo, min(lo + HISTORY_CHUNK_ROWS, high + 1))
+                for lo in range(low, high + 1, HISTORY_CHUNK_ROWS)]
+    hiring_agent._migrate_legacy_history()
+    path = str(hiring_agent.HISTORY_PATH)
+    try:
+        total = os.path.getsize(path)
+    except FileNotFoundError:
+        return []
+    parts, pos = [], start or 0
+    with open(path, "rb") as f:
+        while pos < total:
+            end = min(pos + HISTORY_CHUNK_BYTES, total)
+            if end < total:
+                # extend to the end of the line so no record is split between workers
+                f.seek(end)
+                end += len(f.readline())
+            parts.append(("jsonl", path, pos, end))
+            pos = end
+    return parts
+
+
+@contextmanager
+def _worker_map(workers: int) -> Iterator[Callable]:
+    # pool.map over worker processes, or plain map in this process for workers=1.
+    # spawn, not fork: a forked child of a threaded process (service, Streamlit)
+    # can inherit a lock held by another thread. Spawned children re-import
+    # __main__, so callers without a real script use verify_agentfacts_isolated.
+    if workers <= 1:
+        yield map
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield pool.map
+
+
+class _Chain:
+    """Joins the per-range prev_hash checks of consecutive history ranges into one chain."""
+
+    def __init__(self, prev_hash: str = CHAIN_GENESIS, started: bool = False):
+        self.prev_hash = prev_hash  # hash of the record just before the next range
+        self.started = started      # a chained record has been seen (legacy records may precede it)
+        self.unchained = 0
+
+    def feed(self, part: Dict, base: int) -> List[int]:
+        """History positions where the chain breaks in this range (base = position of its first record)."""
+        count = len(part["keys"])
+        if not count:
+            return []
+        breaks = []
+        leading = part["leading_unchained"]
+        if leading and self.started:
+            breaks.extend(range(base, base + leading))
+        elif leading:
+            self.unchained += leading
+        elif part["first_prev"] != self.prev_hash:
+            breaks.append(base)
+        breaks.extend(base + i for i in part["breaks"])
+        self.started = self.started or leading < count
+        self.prev_hash = part["last_hash"]
+        return breaks
+
+
+# ---- audit ----
+
+def verify_history_chain(checkpoint: Dict = None, workers: int = None) -> Dict:
+    """
+    Check the prev_hash chain of the history, from genesis or from a trusted
+    checkpoint {"backend", "index", "hash", "offset"} returned by an earlier
+    run. With a checkpoint only the record it names (whose hash must still
+    match) and the records after it are read. The report's "checkpoint" names
+    the newest record; store it once the report is "ok" to resume from there.
+    """
+    started = time.perf_counter()
+    workers = max(workers or os.cpu_count() or 1, 1)
+    backend = "sqlite" if hiring_agent._use_sqlite() else "jsonl"
+    if checkpoint and checkpoint.get("backend", backend) != backend:
+        raise ValueError(f"checkpoint is for the {checkpoint['backend']} history, not {backend}")
+    base = checkpoint["index"] if checkpoint else 0
+    chain = _Chain()
+    breaks: List[int] = []
+    count, last = 0, None
+    with _worker_map(workers) as mapper:
+        for part in mapper(partial(_history_part, key=None), _history_parts(checkpoint["offset"] if checkpoint else None)):
+            if not part["keys"]:
+                continue
+            if checkpoint and not count:
+                # the checkpoint record itself is vouched for by its stored hash, not by its link
+                if part["first_hash"] != checkpoint["hash"]:
+                    breaks.append(base)
+                chain = _Chain(part["first_prev"], part["first_prev"] is not None)
+            breaks.extend(chain.feed(part, base + count))
+            count += len(part["keys"])
+            last = part
+    if checkpoint and not count:
+        # nothing at the checkpoint's offset any more: the history was truncated or rewritten
+        breaks.append(base)
+    new_checkpoint = dict(checkpoint or {})
+    if last:
+        new_checkpoint = {"backend": backend, "index": base + count - 1, "hash": last["last_hash"],
+                          "offset": last["last_offset"]}
+    return {
+        "ok": not breaks,
+        "from_index": base,
+        "records": count,
+        "unchained": chain.unchained,
+        "breaks": breaks[:MAX_ISSUES],
+        "first_break": breaks[0] if breaks else None,
+        "checkpoint": new_checkpoint or None,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def verify_history_signatures(workers: int = None, key: bytes = None) -> Dict:
+    """
+    Check every history record's own HMAC, in parallel. Records written
+    before per-record signing are counted as "unsigned", not as invalid.
+    """
+    started = time.perf_counter()
+    workers = max(workers or os.cpu_count() or 1, 1)
+    key = key or ensure_secret_key()
+    records, unsigned, invalid = 0, 0, []
+    invalid_count = 0
+    with _worker_map(workers) as mapper:
+        for part in mapper(partial(_history_part, key=key), _history_parts()):
+            invalid_count += len(part["invalid"])
+            invalid.extend(records + i for i in part["invalid"][:MAX_ISSUES - len(invalid)])
+            unsigned += part["unsigned"]
+            records += len(part["keys"])
+    return {
+        "ok": not invalid_count,
+        "records": records,
+        "valid": records - unsigned - invalid_count,
+        "unsigned": unsigned,
+        "invalid": invalid_count,
+        # history positions, capped at MAX_ISSUES
+        "invalid_positions": invalid,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def verify_agentfacts(workers: int = None, key: bytes = None) -> Dict:
+    """
+    Recompute roots, chain and signature of agentfacts.json and cross-check
+    the activity log against the history by record id. Returns a report with
+    "ok", "issues" and the first issue in each position space:
+    "first_divergence" (activity log position) and "first_history_divergence"
+    (history record position). Each issue's "space" says which one its
+    position is in ("log", "history", or None for the signature); issues are
+    sorted by space, then position.
+    """
+    started = time.perf_counter()
+    agentfacts = hiring_agent.load_agentfacts(strict=True)
+    checkpoints = agentfacts.get("checkpoints") or []
+    logs = agentfacts.get("logs", [])
+    issues = []
+    divergent = 0
+
+    def issue(kind: str, position, message: str, **extra):
+        if len(issues) < MAX_ISSUES:
+            space = None if position is None else "history" if kind in HISTORY_ISSUES else "log"
+            issues.append(dict(kind=kind, position=position, space=space, message=message, **extra))
+
+    workers = max(workers or os.cpu_count() or 1, 1)
+    parts = _history_parts()
+    if key is None and (agentfacts or parts):
+        key = ensure_secret_key()
+    with _worker_map(workers) as mapper:
+        # both maps are submitted before either is consumed, so the workers stay busy
+        digests = mapper(_segment_digest, [str(hiring_agent._segment_path(cp["segment"])) for cp in checkpoints])
+        history_parts = mapper(partial(_history_part, key=key), parts)
+
+        # sealed segments and the checkpoint chain
+        log_keys: List[Tuple] = []
+        chain = CHAIN_GENESIS
+        for cp, digest in zip(checkpoints, digests):
+            position, segment = len(log_keys), cp["segment"]
+            if digest["error"]:
+                issue("segment_missing", position, f"segment {segment}: {digest['error']}", segment=segment)
+                log_keys.extend([None] * cp["count"])
+            else:
+                if digest["root"] != cp["merkle_root"]:
+                    issue("segment_root", position, f"segment {segment}: entries hash to {digest['root']}, "
+                          f"checkpoint has {cp['merkle_root']}", segment=segment)
+                elif (digest["stored_root"], digest["chain"]) != (cp["merkle_root"], cp["chain"]) or digest["prev_chain"] != chain:
+                    issue("segment_header", position, f"segment {segment}: stored root/chain differ from the checkpoints",
+                          segment=segment)
+                keys = digest["keys"]
+                if len(keys) != cp["count"]:
+                    issue("segment_count", position, f"segment {segment}: {len(keys)} entries, "
+                          f"checkpoint says {cp['count']}", segment=segment)
+                    # keep later positions aligned with the history
+                    keys = (keys + [None] * cp["count"])[:cp["count"]]
+                log_keys.extend(keys)
+            if hiring_agent._chain_step(chain, cp["merkle_root"]) != cp["chain"]:
+                issue("chain", position, f"checkpoint {segment}: chain link does not follow from the previous one",
+                      segment=segment)
+            # continue from the stored link so one bad link is reported once
+            chain = cp["chain"]
+
+        # active segment, signed root and signature
+        active_start = len(log_keys)
+        log_keys.extend(_entry_key(e) for e in logs)
+        root, signature_valid = None, None
+        if agentfacts:
+            # an empty agentfacts (no evaluation yet) has nothing signed
+            root = merkle_root(hiring_agent._head_leaves(agentfacts) + logs + [agentfacts.get("policy_checks", {})])
+            if root != agentfacts.get("merkle_root"):
+                issue("merkle_root", active_start, f"active log hashes to {root}, agentfacts has {agentfacts.get('merkle_root')}")
+            expected = hmac.new(key, (agentfacts.get("merkle_root") or "").encode(), hashlib.sha256).hexdigest()
+            signature_valid = hmac.compare_digest(expected, agentfacts.get("signature") or "")
+            if not signature_valid:
+                issue("signature", None, "signature does not match merkle_root under secret.key")
+
+        # each log entry against the history record it was written with, matched by
+        # record id in order (ids can repeat: same name within one second). A history
+        # record without a log entry (its agentfacts write failed) is reported once
+        # instead of shifting every later comparison.
+        log_index: Dict[str, List[int]] = {}
+        for position, log_key in enumerate(log_keys):
+            if log_key is not None:
+                log_index.setdefault(log_key[0], []).append(position)
+        history_count, unsigned, last_logged = 0, 0, -1
+        orphans: List[int] = []
+        history_chain = _Chain()
+        for part in history_parts:
+            for i in part["invalid"]:
+                issue("record_signature", history_count + i, f"history record {history_count + i} fails its own signature")
+            for i in history_chain.feed(part, history_count):
+                issue("record_chain", i, f"history record {i} does not link to the record before it")
+            unsigned += part["unsigned"]
+            for offset, history_key in enumerate(part["keys"], history_count):
+                positions = log_index.get(history_key[0])
+                if not positions:
+                    orphans.append(offset)
+                    continue
+                position = positions.pop(0)
+                last_logged = offset
+                log_key = log_keys[position]
+                if log_key != history_key:
+                    divergent += 1
+                    issue("history_mismatch", position, f"log entry {position} does not match history record {offset}",
+                          log=list(log_key), history=list(history_key), record=offset)
+            history_count += len(part["keys"])
+
+    # records after the last logged one were appended after the last signed write
+    # (in flight, or lost to a crash before it); earlier ones never made it into the log
+    unlogged = [i for i in orphans if i > last_logged]
+    for i in orphans[:len(orphans) - len(unlogged)]:
+        issue("history_unlogged", i, f"history record {i} has no log entry")
+    missing = sum(len(positions) for positions in log_index.values())
+    if missing:
+        first = min(positions[0] for positions in log_index.values() if positions)
+        issue("history_missing", first, f"{missing} log entries have no history record")
+    spaces = {"log": 0, "history": 1, None: 2}
+    issues.sort(key=lambda i: (spaces[i["space"]], i["position"] or 0))
+    return {
+        "ok": not issues,
+        "log_entries": len(log_keys),
+        "history_records": history_count,
+        # records appended after the last signed write (in flight, or lost to a crash before it)
+        "unlogged_history": len(unlogged),
+        "segments": len(checkpoints),
+        "merkle_root": root,
+        "signature_valid": signature_valid,
+        "divergent_entries": divergent,
+        "unsigned_records": unsigned,
+        "unchained_records": history_chain.unchained,
+        "first_divergence": next((i for i in issues if i["space"] == "log"), None),
+        "first_history_divergence": next((i for i in issues if i["space"] == "history"), None),
+        "issues": issues,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def verify_agentfacts_isolated(workers: int = None) -> Dict:
+    """
+    verify_agentfacts() in a fresh `python audit.py --json` process, for
+    callers whose __main__ must not be re-run by spawned workers (Streamlit
+    executes app.py as a fake __main__). Raises RuntimeError if the audit
+    process produces no report.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "--json"]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.run(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout)
+    except ValueError:
+        detail = proc.stderr.strip().splitlines()[-1:] or [f"exit code {proc.returncode}"]
+        raise RuntimeError(f"audit process failed: {detail[0]}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recompute and cross-check every signed evaluation")
+    parser.add_argument("--workers", type=int, default=None, help="hashing/parsing processes (default: CPU count)")
+    parser.add_argument("--chain", action="store_true", help="only check the history prev_hash chain")
+    parser.add_argument("--checkpoint", default=None,
+                        help="with --chain: resume from the checkpoint in this file and store the new one on success")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.chain:
+        checkpoint = safe_load_json(args.checkpoint, default=None, strict=True) if args.checkpoint else None
+        report = verify_history_chain(checkpoint, workers=args.workers)
+        if report["ok"] and args.checkpoint and report["checkpoint"]:
+            safe_save_json(args.checkpoint, report["checkpoint"])
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{report['records']} history records from #{report['from_index']}, "
+                  f"{report['unchained']} written before chaining, {report['seconds']}s with {report['workers']} workers")
+            if report["first_break"] is not None:
+                print(f"chain broken at history record {report['first_break']} ({len(report['breaks'])} breaks)")
+            print("chain intact" if report["ok"] else "chain BROKEN")
+        return 0 if report["ok"] else 1
+
+    report = verify_agentfacts(workers=args.workers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['log_entries']} log entries in {report['segments']} sealed segments + active, "
+              f"{report['history_records']} history records, {report['seconds']}s with {report['workers']} workers")
+        if report["signature_valid"] is not None:
+            print(f"signature: {'valid' if report['signature_valid'] else 'INVALID'}")
+        for item in report["issues"]:
+            where = f"[{item['space']} {item['position']}] " if item["position"] is not None else ""
+            print(f"  {item['kind']}: {where}{item['message']}")
+        first = report["first_divergence"]
+        if first:
+            print(f"first divergence at log position {first['position']} ({first['kind']})")
+        first = report["first_history_divergence"]
+        if first:
+            print(f"first divergence at history record {first['position']} ({first['kind']})")
+        print("audit passed" if report["ok"] else "audit FAILED")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""
+Benchmarks for the evaluation hot path.
+
+    python benchmark.py                      # 1k, 10k and 100k history/log sizes
+    python benchmark.py --sizes 1000 --out before.json
+    python benchmark.py --only merkle_root,evaluate_candidate
+
+Text benchmarks (sanitize_text, extract_skills, extract_experience_years) run
+over a corpus of synthetic resumes; sanitize_text also runs on one
+multi-megabyte resume and is compared per byte with the pre-scrubber
+implementation (legacy_sanitize_text); every resume must also score the same
+after either (exit code 1 otherwise). merkle_root, safe_save_json, the
+full audit, newest-entry reads and evaluate_candidate run against a synthetic history and agentfacts log of each
+size, built in a temporary directory so real data is never touched. Every
+benchmark reports median and p99 latency and throughput; the JSON results
+file records the environment too, so two runs can be compared.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import hiring_agent
+import utils
+from hiring_agent import CHAIN_GENESIS, evaluate_candidate, _score_candidate
+from audit import verify_agentfacts, verify_history_chain, verify_history_signatures
+from utils import (
+    DEFAULT_SKILLS,
+    sanitize_text,
+    extract_skills,
+    extract_experience_years,
+    merkle_root,
+    safe_save_json,
+    ensure_secret_key,
+    sign_record,
+    canonical_record,
+    record_hash,
+    now_iso,
+)
+
+SIZES = (1000, 10000, 100000)
+POLICY_CHECKS = {"bias_check": "pass", "data_sanitization": "pass", "scoring_integrity": "pass"}
+
+FIRST_NAMES = ["Alex", "Sam", "Priya", "Wei", "Maria", "Omar", "Lena", "Kofi", "Yuki", "Diego"]
+LAST_NAMES = ["Doe", "Patel", "Chen", "Garcia", "Okafor", "Schmidt", "Tanaka", "Silva", "Khan", "Novak"]
+EXTRA_TERMS = ["kubernetes", "terraform", "pandas", "spark", "graphql", "redis", "kafka", "linux", "git", "html"]
+FILLER = [
+    "Designed and shipped features used by thousands of customers.",
+    "Led code reviews and mentored junior engineers on the team.",
+    "Improved latency of the main service by profiling hot paths.",
+    "Worked closely with product managers to scope quarterly roadmaps.",
+    "Maintained CI pipelines and reduced flaky test failures.",
+    "Migrated legacy batch jobs to an event-driven architecture.",
+]
+# tech phrasing that looks like host/path text but is not PII; scrubbing must leave its skills alone
+TECH_PHRASES = [
+    "React.js/Redux and Node.js/Express",
+    "python.org/docs, aws.amazon.com/ec2",
+    "docker.io/library/python",
+    "ASP.NET/C#",
+    "Vue.js/Nuxt",
+    "sklearn.metrics/accuracy",
+]
+
+
+# ======================== SYNTHETIC DATA ========================
+
+def make_resume(rng: random.Random) -> str:
+    """A plausible plain-text resume: contact lines (with PII), skills, experience and projects."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    skills = rng.sample(DEFAULT_SKILLS, rng.randint(2, 8)) + rng.sample(EXTRA_TERMS, rng.randint(0, 4))
+    years = rng.randint(0, 15)
+    lines = [
+        f"Name: {first} {last}",
+        f"Email: {first.lower()}.{last.lower()}@example.com",
+        f"Phone: +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        f"Address: {rng.randint(1, 999)} Main Street",
+        f"Profile: linkedin.com/in/{first.lower()}-{last.lower()}",
+        "",
+        "Summary",
+        f"{'Senior' if years > 7 else 'Mid-level' if years > 3 else 'Junior'} engineer with {years} years of experience.",
+        "",
+        "Skills: " + ", ".join(skills),
+        "",
+        "Experience",
+    ]
+    for _ in range(rng.randint(2, 5)):
+        lines.append(f"- {rng.choice(FILLER)} Stack: {', '.join(rng.sample(skills, min(3, len(skills))))}.")
+    lines.append(f"- Tooling: {rng.choice(TECH_PHRASES)}")
+    lines.append("")
+    lines.append("Projects")
+    for p in range(rng.randint(0, 4)):
+        lines.append(f"- Project {p + 1}: {rng.choice(FILLER)}")
+    return "\n".join(lines)
+
+
+def make_jd(rng: random.Random) -> str:
+    required = rng.sample(DEFAULT_SKILLS, rng.randint(2, 6))
+    return (
+        f"We are hiring an engineer with {rng.randint(1, 8)}+ years of experience. "
+        f"Required: {', '.join(required)}. Nice to have: {rng.choice(EXTRA_TERMS)}."
+    )
+
+
+def make_payload(rng: random.Random, i: int) -> Dict:
+    return {"name": f"Candidate {i}", "resume_text": make_resume(rng), "job_description": make_jd(rng)}
+
+
+def legacy_sanitize_text(text: str) -> str:
+    # sanitize_text before the PII scrubber: tag lines dropped, whitespace collapsed
+    if not text:
+        return ""
+    lines = text.splitlines()
+    filtered = []
+    for ln in lines:
+        low = ln.lower()
+        if any(tag in low for tag in ["name:", "gender:", "age:", "address:"]):
+            continue
+        filtered.append(ln)
+    out = "\n".join(filtered)
+    out = re.sub(r"\s+", " ", out).strip()
+    return out
+
+
+def make_log(record: Dict, ts: str) -> Dict:
+    return {"ts": ts, "action": "evaluate", "details": {"id": record["id"], "decision": record["decision"], "score": record["total_score"]}}
+
+
+@contextmanager
+def workspace():
+    """Point hiring_agent/utils storage at a scratch directory for the duration of the block."""
+    names = ["HISTORY_PATH", "LEGACY_HISTORY_PATH", "AGENTFACTS_PATH", "SKILL_INDEX_PATH", "HISTORY_DB_PATH", "SEGMENTS_DIR"]
+    saved = {name: getattr(hiring_agent, name) for name in names}
+    saved_key, saved_index = utils.SECRET_KEY_FILE, hiring_agent._skill_index_instance
+    with tempfile.TemporaryDirectory(prefix="hiring-bench-") as tmp:
+        root = Path(tmp)
+        for name in names:
+            setattr(hiring_agent, name, root / saved[name].name)
+        utils.SECRET_KEY_FILE = root / "secret.key"
+        hiring_agent._skill_index_instance = None
+        hiring_agent._history_db_ready.clear()
+        try:
+            yield root
+        finally:
+            for name, value in saved.items():
+                setattr(hiring_agent, name, value)
+            utils.SECRET_KEY_FILE = saved_key
+            hiring_agent._skill_index_instance = saved_index
+            hiring_agent._history_db_ready.clear()
+
+
+def seed_store(size: int, rng: random.Random, templates: int = 200) -> Tuple[Dict, List[Dict]]:
+    """
+    Write `size` chained, signed history records and a matching signed, segmented
+    agentfacts log into the current workspace; returns (agentfacts, all log entries). Records are
+    scored from a pool of synthetic payloads and given unique ids, which keeps
+    seeding 100k records fast.
+    """
+    pool = []
+    for i in range(min(templates, size) or 1):
+        payload = make_payload(rng, i)
+        jd = payload["job_description"]
+        pool.append(_score_candidate(payload, jd, extract_skills(jd, DEFAULT_SKILLS)))
+    ts = now_iso()
+    records, logs = [], []
+    key = ensure_secret_key()
+    prev = CHAIN_GENESIS
+    for i in range(size):
+        record = dict(pool[i % len(pool)], id=f"{i:032x}", name=f"Candidate {i}", prev_hash=prev)
+        record["signature"] = sign_record(record, key)
+        prev = record_hash(record)
+        records.append(record)
+        logs.append(make_log(record, ts))
+    hiring_agent._append_history_batch(records)
+    agentfacts = {"policy_checks": dict(POLICY_CHECKS)}
+    hiring_agent._append_logs(agentfacts, list(logs))
+    agentfacts["signature"] = utils.sign_string(ensure_secret_key(), agentfacts["merkle_root"])
+    agentfacts["last_evaluation"] = records[-1] if records else None
+    safe_save_json(str(hiring_agent.AGENTFACTS_PATH), agentfacts)
+    return agentfacts, logs
+
+
+# ======================== MEASUREMENT ========================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(fn: Callable[[int], None], repeat: int, max_seconds: float, min_repeat: int = 5,
+            bytes_per_call: float = None) -> Dict:
+    """
+    Call fn(i) up to `repeat` times (stopping after max_seconds once min_repeat
+    calls are in). With bytes_per_call, throughput is also given in MB/s.
+    """
+    samples = []
+    started = time.perf_counter()
+    for i in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - t0) / 1e9)
+        if len(samples) >= min_repeat and time.perf_counter() - started > max_seconds:
+            break
+    total = sum(samples)
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "median_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(total / len(samples) * 1000, 4),
+        "ops_per_s": round(len(samples) / total, 1) if total else None,
+        "mb_per_s": round(bytes_per_call * len(samples) / total / 1e6, 2) if bytes_per_call and total else None,
+    }
+
+
+# ======================== BENCHMARKS ========================
+
+def text_benchmarks(corpus: List[str], jds: List[str], large: str) -> Dict[str, Tuple[Callable[[int], None], float]]:
+    """name -> (fn(i), average input bytes per call)"""
+    n = len(corpus)
+    corpus_bytes = sum(len(t) for t in corpus) / n
+    return {
+        "sanitize_text": (lambda i: sanitize_text(corpus[i % n]), corpus_bytes),
+        "sanitize_text_legacy": (lambda i: legacy_sanitize_text(corpus[i % n]), corpus_bytes),
+        "sanitize_text_large": (lambda i: sanitize_text(large), len(large)),
+        "sanitize_text_legacy_large": (lambda i: legacy_sanitize_text(large), len(large)),
+        "extract_skills": (lambda i: extract_skills(corpus[i % n], DEFAULT_SKILLS), corpus_bytes),
+        "extract_skills_jd": (lambda i: extract_skills(jds[i % len(jds)], DEFAULT_SKILLS), sum(len(j) for j in jds) / len(jds)),
+        "extract_experience_years": (lambda i: extract_experience_years(corpus[i % n]), corpus_bytes),
+    }
+
+
+def scoring_parity(corpus: List[str]) -> Dict:
+    """
+    Resumes whose extracted skills or experience differ between the PII
+    scrubber and legacy_sanitize_text; redaction must only remove PII.
+    """
+    mismatches = []
+    for i, text in enumerate(corpus):
+        new, old = sanitize_text(text), legacy_sanitize_text(text)
+        got = (extract_skills(new, DEFAULT_SKILLS), extract_experience_years(new))
+        want = (extract_skills(old, DEFAULT_SKILLS), extract_experience_years(old))
+        if got != want:
+            mismatches.append({"index": i, "scrubbed": list(got), "legacy": list(want)})
+    return {"checked": len(corpus), "mismatches": len(mismatches), "examples": mismatches[:5]}
+
+
+STORE_BENCHMARKS = ("merkle_root", "safe_save_json", "verify_agentfacts", "sign_record", "sign_record_uncached",
+                    "verify_history_signatures", "verify_history_chain", "verify_history_chain_resume",
+                    "load_history", "tail_history", "tail_logs", "evaluate_candidate")
+
+
+def bench_store(size: int, rng: random.Random, repeat: int, max_seconds: float,
+                wanted: Callable[[str], bool]) -> Iterator[Tuple[str, Dict]]:
+    with workspace() as root:
+        agentfacts, logs = seed_store(size, rng)
+        # merkle_root over the whole log, as if it were one unsegmented tree
+        leaves = logs + [agentfacts["policy_checks"]]
+        if wanted("merkle_root"):
+            yield "merkle_root", measure(lambda i: merkle_root(leaves), repeat, max_seconds)
+        if wanted("safe_save_json"):
+            scratch = str(root / "agentfacts.bench.json")
+            yield "safe_save_json", measure(lambda i: safe_save_json(scratch, agentfacts), repeat, max_seconds)
+        del agentfacts, logs, leaves
+
+        if wanted("verify_agentfacts"):
+            # whole-store audit: a few calls are enough
+            yield "verify_agentfacts", measure(lambda i: verify_agentfacts(), repeat, max_seconds, min_repeat=3)
+
+        # per-record HMAC: cached key + copied HMAC state vs reading the key file and keying a new HMAC
+        sample = hiring_agent.tail_history(256)
+        if wanted("sign_record"):
+            yield "sign_record", measure(lambda i: sign_record(sample[i % len(sample)]), repeat, max_seconds)
+        if wanted("sign_record_uncached"):
+            yield "sign_record_uncached", measure(
+                lambda i: hmac.new(utils.SECRET_KEY_FILE.read_bytes(), canonical_record(sample[i % len(sample)]),
+                                   hashlib.sha256).hexdigest(),
+                repeat, max_seconds,
+            )
+        if wanted("verify_history_signatures"):
+            yield "verify_history_signatures", measure(lambda i: verify_history_signatures(), repeat, max_seconds,
+                                                       min_repeat=3)
+
+        # hash chain: full scan from genesis vs resuming from a checkpoint 20 appends back
+        if wanted("verify_history_chain"):
+            yield "verify_history_chain", measure(lambda i: verify_history_chain(), repeat, max_seconds, min_repeat=3)
+        if wanted("verify_history_chain_resume"):
+            # checkpoint at the current head, then 20 more appends for each resumed check to cover
+            checkpoint = verify_history_chain()["checkpoint"]
+            for i in range(20):
+                evaluate_candidate(make_payload(rng, 2 * size + i))
+            yield "verify_history_chain_resume", measure(lambda i: verify_history_chain(checkpoint), repeat,
+                                                         max_seconds)
+
+        # newest 20 entries: whole-file read vs tail read
+        if wanted("load_history"):
+            yield "load_history", measure(lambda i: hiring_agent.load_history()[-20:], repeat, max_seconds)
+        if wanted("tail_history"):
+            yield "tail_history", measure(lambda i: hiring_agent.tail_history(20), repeat, max_seconds)
+        if wanted("tail_logs"):
+            yield "tail_logs", measure(lambda i: hiring_agent.tail_logs(20), repeat, max_seconds)
+
+        if wanted("evaluate_candidate"):
+            payloads = [make_payload(rng, size + i) for i in range(min(repeat, 256))]
+            hiring_agent._skill_index()  # build the index outside the timed calls
+            yield "evaluate_candidate", measure(
+                lambda i: evaluate_candidate(payloads[i % len(payloads)]), repeat, max_seconds
+            )
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(Path(__file__).resolve().parent),
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(sizes: List[int], repeat: int, corpus_size: int, max_seconds: float, seed: int, only: List[str] = None,
+        large_bytes: int = 4 * 1024 * 1024) -> Dict:
+    rng = random.Random(seed)
+    corpus = [make_resume(rng) for _ in range(corpus_size)]
+    jds = [make_jd(rng) for _ in range(max(corpus_size // 10, 1))]
+    benchmarks = []
+
+    def wanted(name: str) -> bool:
+        return not only or name in only
+
+    def record(name: str, size: int, stats: Dict):
+        benchmarks.append(dict(name=name, size=size, **stats))
+        _print_row(benchmarks[-1])
+
+    # one multi-megabyte resume: the whole corpus run together
+    parity = scoring_parity(corpus + TECH_PHRASES)
+    print(f"scoring parity: {parity['mismatches']} of {parity['checked']} resumes score differently after scrubbing",
+          file=sys.stderr)
+    large = "\n\n".join(corpus)
+    while len(large) < large_bytes:
+        large += "\n\n" + large
+    for name, (fn, nbytes) in text_benchmarks(corpus, jds, large).items():
+        if wanted(name):
+            size = 1 if name.endswith("_large") else corpus_size
+            record(name, size, measure(fn, repeat, max_seconds, bytes_per_call=nbytes))
+    if any(wanted(name) for name in STORE_BENCHMARKS):
+        for size in sizes:
+            for name, stats in bench_store(size, random.Random(seed + size), repeat, max_seconds, wanted):
+                record(name, size, stats)
+
+    return {
+        "created": now_iso(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "history_backend": hiring_agent.HISTORY_BACKEND,
+        "params": {"sizes": sizes, "repeat": repeat, "corpus": corpus_size, "max_seconds": max_seconds, "seed": seed,
+                   "large_bytes": large_bytes},
+        "scoring_parity": parity,
+        "benchmarks": benchmarks,
+    }
+
+
+def _print_row(row: Dict):
+    print(
+        f"{row['name']:<26} size={row['size']:<7} calls={row['calls']:<5} "
+        f"median={row['median_ms']:>10.4f} ms  p99={row['p99_ms']:>10.4f} ms  {row['ops_per_s']:>10} ops/s"
+        + (f"  {row['mb_per_s']:>8} MB/s" if row.get("mb_per_s") else ""),
+        flush=True,
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python benchmark.py", description="Benchmark the evaluation hot path")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="comma-separated history/log sizes")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per benchmark")
+    parser.add_argument("--corpus", type=int, default=1000, help="synthetic resumes for the text benchmarks")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="time budget per benchmark (at least 5 calls)")
+    parser.add_argument("--large-mb", type=float, default=4.0, help="size of the large resume for sanitize_text")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = [s.strip() for s in args.only.split(",") if s.strip()] or None
+    results = run(sizes, max(args.repeat, 1), max(args.corpus, 1), args.max_seconds, args.seed, only,
+                  large_bytes=int(args.large_mb * 1024 * 1024))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.out}", file=sys.stderr)
+    return 1 if results["scoring_parity"]["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,533 @@
+import argparse
 import json
 import os
+import sys
+import threading
 import hmac
 import hashlib
+import queue
+import sqlite3
+import tempfile
 import time
-from typing import Dict, List, Any
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Any, TextIO, Tuple
 
 from pathlib import Path
+import numpy as np
+import metrics
+from metrics import span
 from utils import (
     DEFAULT_SKILLS,
-    sanitize_text,
+    scrub_pii,
     extract_skills,
     extract_experience_years,
     extract_project_count,
     now_iso,
     safe_load_json,
     safe_save_json,
+    iter_jsonl,
+    tail_jsonl,
+    append_jsonl,
+    file_signature,
+    file_lock,
     merkle_root,
+    MerkleAccumulator,
+    merkle_proof,
+    verify_merkle_proof,
     ensure_secret_key,
     sign_string,
+    sign_record,
+    record_hash,
     make_txt_report,
+    ingest_resumes,
 )
 
 
 BASE_DIR = Path(__file__).resolve().parent
-HISTORY_PATH = BASE_DIR / "history.json"
+HISTORY_PATH = BASE_DIR / "history.jsonl"
+LEGACY_HISTORY_PATH = BASE_DIR / "history.json"
 AGENTFACTS_PATH = BASE_DIR / "agentfacts.json"
+SKILL_INDEX_PATH = BASE_DIR / "skill_index.jsonl"
+HISTORY_DB_PATH = BASE_DIR / "history.db"
 SECRET_KEY_PATH = BASE_DIR / "secret.key"
+SEGMENTS_DIR = BASE_DIR / "agentfacts_segments"
+
+SHORTLIST_THRESHOLD = 60
+
+# activity log entries per sealed segment file; agentfacts.json keeps fewer than this
+LOG_SEGMENT_SIZE = int(os.environ.get("HIRING_LOG_SEGMENT_SIZE", "1000"))
+CHAIN_GENESIS = "0" * 64
+
+# "jsonl" (default) or "sqlite" for indexed history queries
+HISTORY_BACKEND = os.environ.get("HIRING_HISTORY_BACKEND", "jsonl").lower()
+
+
+def _migrate_legacy_history():
+    # one-time conversion of the old history.json array into the append-only history.jsonl
+    if HISTORY_PATH.exists() or not LEGACY_HISTORY_PATH.exists():
+        return
+    # several processes can get here on first access; the loser of the lock
+    # re-checks and finds the migration (and any appends after it) done
+    with file_lock(str(HISTORY_PATH)):
+        if HISTORY_PATH.exists() or not LEGACY_HISTORY_PATH.exists():
+            return
+        arr = safe_load_json(str(LEGACY_HISTORY_PATH), default=None)
+        if not isinstance(arr, list):
+            return
+        fd, tmp = tempfile.mkstemp(dir=str(HISTORY_PATH.parent), prefix=f".{HISTORY_PATH.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for entry in arr:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, HISTORY_PATH)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        os.replace(LEGACY_HISTORY_PATH, LEGACY_HISTORY_PATH.with_name(LEGACY_HISTORY_PATH.name + ".migrated"))
+
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    name TEXT,
+    decision TEXT,
+    total_score REAL,
+    timestamp INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_id ON history(id);
+CREATE INDEX IF NOT EXISTS idx_history_decision ON history(decision, total_score);
+CREATE INDEX IF NOT EXISTS idx_history_total_score ON history(total_score);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+"""
+_HISTORY_SORT_DEFAULTS = {"total_score": 0, "timestamp": 0, "name": ""}
+_history_db_ready = set()
+
+
+def _history_row(entry: Dict) -> Tuple:
+    return (entry.get("id"), entry.get("name"), entry.get("decision"), entry.get("total_score"),
+            entry.get("timestamp"), json.dumps(entry))
+
+
+@contextmanager
+def _history_db() -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(str(HISTORY_DB_PATH), timeout=30)
+    try:
+        if str(HISTORY_DB_PATH) not in _history_db_ready:
+            # WAL lets dashboard sessions keep reading while an evaluation writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_HISTORY_SCHEMA)
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None:
+                # first use of the database: import the JSONL history
+                _migrate_legacy_history()
+                conn.executemany(
+                    "INSERT INTO history (id, name, decision, total_score, timestamp, record) VALUES (?, ?, ?, ?, ?, ?)",
+                    (_history_row(e) for e in iter_jsonl(str(HISTORY_PATH))),
+                )
+            conn.commit()
+            _history_db_ready.add(str(HISTORY_DB_PATH))
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _use_sqlite() -> bool:
+    return HISTORY_BACKEND == "sqlite"
 
 
 def _read_history() -> List[Dict]:
-    return safe_load_json(str(HISTORY_PATH), default=[]) or []
+    if _use_sqlite():
+        with _history_db() as conn:
+            return [json.loads(r[0]) for r in conn.execute("SELECT record FROM history ORDER BY seq")]
+    _migrate_legacy_history()
+    return list(iter_jsonl(str(HISTORY_PATH)))
 
 
 def _append_history(entry: Dict):
-    arr = _read_history()
-    arr.append(entry)
-    safe_save_json(str(HISTORY_PATH), arr)
+    _append_history_batch([entry])
+
+
+def _append_history_batch(entries: List[Dict]):
+    if _use_sqlite():
+        with _history_db() as conn:
+            conn.executemany(
+                "INSERT INTO history (id, name, decision, total_score, timestamp, record) VALUES (?, ?, ?, ?, ?, ?)",
+                [_history_row(e) for e in entries],
+            )
+        return
+    _migrate_legacy_history()
+    append_jsonl(str(HISTORY_PATH), entries)
 
 
 def load_history() -> List[Dict]:
     return _read_history()
 
 
-def load_agentfacts() -> Dict:
-    return safe_load_json(str(AGENTFACTS_PATH), default={}) or {}
+def _history_head() -> str:
+    # hash of the newest history record, which the next record links to
+    last = tail_history(1)
+    return record_hash(last[0]) if last else CHAIN_GENESIS
+
+
+def tail_history(n: int) -> List[Dict]:
+    """The n most recently written history records, oldest first, without reading the rest."""
+    if n <= 0:
+        return []
+    if _use_sqlite():
+        with _history_db() as conn:
+            rows = conn.execute("SELECT record FROM history ORDER BY seq DESC LIMIT ?", (n,)).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+    _migrate_legacy_history()
+    return tail_jsonl(str(HISTORY_PATH), n)
+
+
+def history_signature() -> Tuple:
+    """File identity of the active history store; changes on every write, for caching reads."""
+    if _use_sqlite():
+        return file_signature(HISTORY_DB_PATH, f"{HISTORY_DB_PATH}-wal", SKILL_INDEX_PATH)
+    return file_signature(HISTORY_PATH, LEGACY_HISTORY_PATH, SKILL_INDEX_PATH)
+
+
+def agentfacts_signature() -> Tuple:
+    return file_signature(AGENTFACTS_PATH)
+
+
+def _history_where(decision: str = None, ids: List[str] = None) -> Tuple[str, List]:
+    clauses, params = [], []
+    if decision:
+        clauses.append("decision = ?")
+        params.append(decision)
+    if ids is not None:
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(ids)))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _history_filter(decision: str = None, ids: List[str] = None) -> List[Dict]:
+    wanted = set(ids) if ids is not None else None
+    return [
+        r for r in _read_history()
+        if (not decision or r.get("decision") == decision) and (wanted is None or r.get("id") in wanted)
+    ]
+
+
+def query_history(decision: str = None, sort_by: str = "total_score", ascending: bool = False,
+                  limit: int = None, offset: int = 0, ids: List[str] = None) -> List[Dict]:
+    """
+    History records filtered by decision and/or record ids, sorted by
+    total_score, timestamp or name, then sliced by limit/offset. The SQLite
+    backend pushes all of this into one indexed query.
+    """
+    if sort_by not in _HISTORY_SORT_DEFAULTS:
+        raise ValueError(f"cannot sort history by {sort_by!r}")
+    if _use_sqlite():
+        where, params = _history_where(decision, ids)
+        order = "ASC" if ascending else "DESC"
+        sql = f"SELECT record FROM history{where} ORDER BY {sort_by} {order}, seq LIMIT ? OFFSET ?"
+        with _history_db() as conn:
+            rows = conn.execute(sql, params + [-1 if limit is None else limit, offset])
+            return [json.loads(r[0]) for r in rows]
+    rows = _history_filter(decision, ids)
+    default = _HISTORY_SORT_DEFAULTS[sort_by]
+    rows.sort(key=lambda r: r.get(sort_by, default), reverse=not ascending)
+    return rows[offset:None if limit is None else offset + limit]
+
+
+def history_stats(decision: str = None, ids: List[str] = None) -> Dict:
+    """Count, shortlisted/rejected counts and score aggregates over the filtered history."""
+    if _use_sqlite():
+        where, params = _history_where(decision, ids)
+        sql = (
+            "SELECT COUNT(*), COALESCE(SUM(decision = 'Shortlist'), 0), COALESCE(SUM(decision = 'Reject'), 0), "
+            f"AVG(total_score), MIN(total_score), MAX(total_score) FROM history{where}"
+        )
+        with _history_db() as conn:
+            count, shortlisted, rejected, avg, low, high = conn.execute(sql, params).fetchone()
+    else:
+        rows = _history_filter(decision, ids)
+        scores = [r.get("total_score", 0) for r in rows]
+        count = len(rows)
+        shortlisted = sum(1 for r in rows if r.get("decision") == "Shortlist")
+        rejected = sum(1 for r in rows if r.get("decision") == "Reject")
+        avg = sum(scores) / count if count else None
+        low = min(scores) if scores else None
+        high = max(scores) if scores else None
+    return {
+        "count": count,
+        "shortlisted": shortlisted,
+        "rejected": rejected,
+        "avg_score": avg,
+        "min_score": low,
+        "max_score": high,
+    }
+
+
+def load_agentfacts(strict: bool = False) -> Dict:
+    return safe_load_json(str(AGENTFACTS_PATH), default={}, strict=strict) or {}
 
 
 def _write_agentfacts(agentfacts: Dict):
     safe_save_json(str(AGENTFACTS_PATH), agentfacts)
 
 
+class SkillIndex:
+    """
+    Packed skill bitmasks for every evaluated candidate.
+
+    The index file is append-only JSONL: {"vocab": [...]} lines grow the skill
+    vocabulary (bit positions never change) and {"id", "mask"} lines hold one
+    record's skills as a hex bitmask. In memory the masks form an (N, words)
+    uint64 array, so boolean skill queries are a few vectorized AND/compare
+    passes. refresh() only parses lines appended since the last read.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.vocab: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self._masks: List[int] = []
+        self._matrix = np.zeros((0, 1), dtype=np.uint64)
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _words(self) -> int:
+        return max((len(self.vocab) + 63) // 64, 1)
+
+    def _load_lines(self, lines: List[Dict]):
+        for obj in lines:
+            if "vocab" in obj:
+                for skill in obj["vocab"]:
+                    if skill not in self.positions:
+                        self.positions[skill] = len(self.vocab)
+                        self.vocab.append(skill)
+            elif "id" in obj:
+                self.ids.append(obj["id"])
+                self._masks.append(int(obj["mask"], 16))
+
+    def _sync_matrix(self):
+        words = self._words()
+        have, width = self._matrix.shape
+        if width != words:
+            have = 0
+            self._matrix = np.zeros((0, words), dtype=np.uint64)
+        if have == len(self._masks):
+            return
+        low = (1 << 64) - 1
+        new_rows = np.array(
+            [[(mask >> (64 * w)) & low for w in range(words)] for mask in self._masks[have:]],
+            dtype=np.uint64,
+        ).reshape(-1, words)
+        self._matrix = np.vstack([self._matrix, new_rows])
+
+    def refresh(self):
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            end = data.rfind(b"\n") + 1  # leave a partially written line for the next refresh
+            lines = []
+            for line in data[:end].splitlines():
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    continue
+            self._offset += end
+            self._load_lines(lines)
+
+    def add(self, records: List[Dict]):
+        self.refresh()
+        with self._lock:
+            new_vocab = []
+            for record in records:
+                for skill in record.get("skills", []):
+                    if skill not in self.positions and skill not in new_vocab:
+                        new_vocab.append(skill)
+            positions = dict(self.positions)
+            for skill in new_vocab:
+                positions[skill] = len(positions)
+            lines = [{"vocab": new_vocab}] if new_vocab else []
+            for record in records:
+                mask = 0
+                for skill in record.get("skills", []):
+                    mask |= 1 << positions[skill]
+                lines.append({"id": record["id"], "mask": format(mask, "x")})
+            append_jsonl(str(self.path), lines)
+            self._offset = self.path.stat().st_size
+            self._load_lines(lines)
+
+    def query(self, all_of: List[str] = None, any_of: List[str] = None, none_of: List[str] = None) -> List[str]:
+        """Ids of candidates having every all_of skill, at least one any_of skill and no none_of skill."""
+        self.refresh()
+        with self._lock:
+            self._sync_matrix()
+            matrix = self._matrix
+            words = matrix.shape[1]
+            sel = np.ones(matrix.shape[0], dtype=bool)
+            if any(s not in self.positions for s in all_of or []):
+                return []
+            required = self._query_mask(all_of, words)
+            sel &= ((matrix & required) == required).all(axis=1)
+            forbidden = self._query_mask(none_of, words)
+            sel &= ((matrix & forbidden) == 0).all(axis=1)
+            if any_of:
+                wanted = self._query_mask(any_of, words)
+                sel &= ((matrix & wanted) != 0).any(axis=1)
+            return [self.ids[i] for i in np.flatnonzero(sel)]
+
+    def _query_mask(self, skills: List[str], words: int) -> np.ndarray:
+        mask = np.zeros(words, dtype=np.uint64)
+        for skill in skills or []:
+            pos = self.positions.get(skill)
+            if pos is not None:
+                mask[pos // 64] |= np.uint64(1 << (pos % 64))
+        return mask
+
+
+_skill_index_instance = None
+_skill_index_lock = threading.Lock()
+
+
+def _skill_index() -> SkillIndex:
+    global _skill_index_instance
+    with _skill_index_lock:
+        if _skill_index_instance is None or _skill_index_instance.path != SKILL_INDEX_PATH:
+            index = SkillIndex(SKILL_INDEX_PATH)
+            if not SKILL_INDEX_PATH.exists():
+                # first use: index everything already in history
+                history = _read_history()
+                if history:
+                    index.add(history)
+            _skill_index_instance = index
+        return _skill_index_instance
+
+
+def query_skills(all_of: List[str] = None, any_of: List[str] = None, none_of: List[str] = None) -> List[str]:
+    """Record ids from history matching a boolean skill query, e.g. python AND aws AND NOT java."""
+    return _skill_index().query(all_of, any_of, none_of)
+
+
+def skill_vocabulary() -> List[str]:
+    index = _skill_index()
+    index.refresh()
+    return sorted(index.vocab)
+
+
+# ---- segmented activity log ----
+#
+# agentfacts["logs"] only holds the active segment. Every LOG_SEGMENT_SIZE
+# entries it is sealed into SEGMENTS_DIR/segment_NNNNNN.json with its own
+# merkle root, and agentfacts["checkpoints"] gains
+# {"segment", "count", "merkle_root", "chain"} where
+# chain = sha256(previous chain + segment root). The signed merkle_root covers
+# [{"checkpoint": <latest chain>}] + active logs + [policy_checks], so it
+# commits to every sealed segment without reading them.
+
+def _chain_step(prev: str, root: str) -> str:
+    return hashlib.sha256(bytes.fromhex(prev) + bytes.fromhex(root)).hexdigest()
+
+
+def _head_leaves(agentfacts: Dict) -> List[Dict]:
+    # leaf committing to the sealed segments (none before the first seal)
+    checkpoints = agentfacts.get("checkpoints") or []
+    return [{"checkpoint": checkpoints[-1]["chain"]}] if checkpoints else []
+
+
+def _segment_path(segment: int) -> Path:
+    return SEGMENTS_DIR / f"segment_{segment:06d}.json"
+
+
+def load_segment(segment: int) -> Dict:
+    return safe_load_json(str(_segment_path(segment)), default={}) or {}
+
+
+def log_size(agentfacts: Dict) -> int:
+    """Activity log entries across sealed segments and the active one."""
+    sealed = sum(c["count"] for c in agentfacts.get("checkpoints") or [])
+    return sealed + len(agentfacts.get("logs", []))
+
+
+def _log_accumulator(agentfacts: Dict) -> MerkleAccumulator:
+    leaves = _head_leaves(agentfacts) + agentfacts.get("logs", [])
+    state = agentfacts.get("merkle_frontier")
+    if state:
+        acc = MerkleAccumulator.from_dict(state)
+        if acc.size == len(leaves):
+            return acc
+    # agentfacts written before the frontier was stored (or out of sync): rebuild once
+    return MerkleAccumulator.from_items(leaves)
+
+
+def _seal_segment(segment: int, logs: List[Dict], prev_chain: str) -> Dict:
+    root = merkle_root(logs)
+    chain = _chain_step(prev_chain, root)
+    SEGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    # rewriting the same segment number after a crash is harmless: it is only
+    # referenced once agentfacts.json carries its checkpoint
+    safe_save_json(str(_segment_path(segment)), {
+        "segment": segment,
+        "sealed_at": now_iso(),
+        "logs": logs,
+        "merkle_root": root,
+        "prev_chain": prev_chain,
+        "chain": chain,
+    })
+    return {"segment": segment, "count": len(logs), "merkle_root": root, "chain": chain}
+
+
+def _append_logs(agentfacts: Dict, entries: List[Dict]):
+    """
+    Append entries to the active log, sealing full segments, and refresh
+    checkpoints, merkle_frontier and merkle_root. policy_checks must be set.
+    """
+    acc = _log_accumulator(agentfacts)
+    logs = agentfacts.get("logs", []) + entries
+    checkpoints = list(agentfacts.get("checkpoints") or [])
+    if len(logs) >= LOG_SEGMENT_SIZE:
+        # also splits a pre-segmentation log into segments on its first write
+        while len(logs) >= LOG_SEGMENT_SIZE:
+            prev = checkpoints[-1]["chain"] if checkpoints else CHAIN_GENESIS
+            checkpoints.append(_seal_segment(len(checkpoints), logs[:LOG_SEGMENT_SIZE], prev))
+            logs = logs[LOG_SEGMENT_SIZE:]
+        acc = MerkleAccumulator.from_items([{"checkpoint": checkpoints[-1]["chain"]}] + logs)
+    else:
+        for entry in entries:
+            acc.append(entry)
+    agentfacts["logs"] = logs
+    agentfacts["checkpoints"] = checkpoints
+    agentfacts["merkle_frontier"] = acc.to_dict()
+    # same root as merkle_root(head leaves + logs + [policy_checks])
+    agentfacts["merkle_root"] = acc.root(extra=[agentfacts["policy_checks"]])
+
+
+def tail_logs(n: int, agentfacts: Dict = None) -> List[Dict]:
+    """
+    The n newest activity log entries, oldest first. Reads the bounded active
+    segment, plus the newest sealed segments only when it holds fewer than n.
+    """
+    if agentfacts is None:
+        agentfacts = load_agentfacts()
+    out = list(agentfacts.get("logs", [])[-n:]) if n > 0 else []
+    checkpoints = agentfacts.get("checkpoints") or []
+    for cp in reversed(checkpoints):
+        if len(out) >= n:
+            break
+        out = load_segment(cp["segment"]).get("logs", [])[-(n - len(out)):] + out
+    return out
+
+
 def evaluate_candidate(payload: Dict) -> Dict:
     """
     payload keys:
@@ -58,40 +536,92 @@ def evaluate_candidate(payload: Dict) -> Dict:
       - years_experience (optional)
       - projects
       - job_description
+      - extraction, redactions (optional, from utils.ingest_resumes)
     """
-    name = payload.get("name", "")
+    with span("evaluate"):
+        jd = payload.get("job_description", "") or ""
+        with span("extract_jd_skills"):
+            required = extract_skills(jd, DEFAULT_SKILLS)
+        record = _score_candidate(payload, jd, required)
+        agentfacts = _commit_records([record])
+    return {"record": record, "agentfacts": agentfacts}
+
+
+def evaluate_candidates(payloads: List[Dict], job_description: str = None, errors: List[Dict] = None) -> Dict:
+    """
+    Score many candidates and persist them in one history write and one
+    log/merkle/signature update.
+
+    job_description applies to every payload when given; otherwise each
+    payload's own job_description is used (skills extracted once per distinct JD).
+
+    When an errors list is given, a payload that cannot be scored is appended
+    to it as {"index", "name", "error": {"type", "message"}} instead of
+    failing the batch; records then holds the remaining payloads, in order.
+    """
+    with span("evaluate_batch"):
+        required_by_jd: Dict[str, List[str]] = {}
+        records = []
+        for i, payload in enumerate(payloads):
+            try:
+                jd = job_description if job_description is not None else payload.get("job_description", "")
+                jd = jd or ""
+                if not isinstance(jd, str):
+                    raise ValueError(f"job_description must be a string, not {type(jd).__name__}")
+                if jd not in required_by_jd:
+                    with span("extract_jd_skills"):
+                        required_by_jd[jd] = extract_skills(jd, DEFAULT_SKILLS)
+                records.append(_score_candidate(payload, jd, required_by_jd[jd]))
+            except Exception as exc:
+                if errors is None:
+                    raise
+                message = str(exc) if isinstance(exc, ValueError) else f"{type(exc).__name__}: {exc}"
+                name = payload.get("name") if isinstance(payload, dict) else None
+                errors.append({"index": i, "name": name, "error": {"type": "invalid", "message": message}})
+        agentfacts = _commit_records(records) if records else load_agentfacts()
+    return {"records": records, "agentfacts": agentfacts}
+
+
+def _check_payload(payload: Dict):
+    # field types, so a malformed payload fails with a clear ValueError
+    for field in ("name", "resume_text", "skills_text", "projects"):
+        value = payload.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{field} must be a string, not {type(value).__name__}")
+    years = payload.get("years_experience")
+    if years is not None:
+        try:
+            float(years)
+        except (TypeError, ValueError):
+            raise ValueError(f"years_experience must be a number, got {years!r}")
+    if not isinstance(payload.get("redactions") or {}, dict):
+        raise ValueError("redactions must be an object")
+
+
+def _candidate_features(payload: Dict) -> Tuple[List[str], float, int, Dict[str, int]]:
+    _check_payload(payload)
     resume_text = payload.get("resume_text", "") or ""
     skills_text = payload.get("skills_text", "") or ""
-    jd = payload.get("job_description", "") or ""
     projects = payload.get("projects", "") or ""
 
-    # sanitize
-    resume_clean = sanitize_text(resume_text)
+    # sanitize (text from ingest_resumes is already scrubbed; its counts arrive in payload["redactions"])
+    with span("sanitize"):
+        resume_clean, redactions = scrub_pii(resume_text)
+    for kind, n in (payload.get("redactions") or {}).items():
+        redactions[kind] = redactions.get(kind, 0) + n
 
     # extract skills: prefer explicit skills_text, else from resume
-    if skills_text.strip():
-        skills = [s.strip().lower() for s in skills_text.split(",") if s.strip()]
-    else:
-        skills = extract_skills(resume_clean, DEFAULT_SKILLS)
-
-    # job required skills
-    required = extract_skills(jd or "", DEFAULT_SKILLS)
-
-    matched = [s for s in skills if s in required]
-    missing = [s for s in required if s not in skills]
-    extra = [s for s in skills if s not in required]
-
-    # Skill match percent
-    skill_pct = 0.0
-    if required:
-        skill_pct = len(matched) / len(required) * 100.0
-    else:
-        skill_pct = min(len(skills) / max(len(DEFAULT_SKILLS), 1), 1.0) * 100.0
+    with span("extract_skills"):
+        if skills_text.strip():
+            skills = [s.strip().lower() for s in skills_text.split(",") if s.strip()]
+        else:
+            skills = extract_skills(resume_clean, DEFAULT_SKILLS)
 
     # Experience
     years = payload.get("years_experience")
     if years is None and resume_clean:
-        years = extract_experience_years(resume_clean)
+        with span("extract_experience"):
+            years = extract_experience_years(resume_clean)
     years = float(years or 0.0)
 
     # Projects
@@ -101,14 +631,40 @@ def evaluate_candidate(payload: Dict) -> Dict:
     elif resume_clean:
         proj_count = extract_project_count(resume_clean)
 
+    return skills, years, proj_count, redactions
+
+
+def _experience_score(years: float) -> float:
+    return round(min(years / 5.0, 1.0) * 25.0, 2)
+
+
+def _projects_score(proj_count: int) -> float:
+    return round(min(proj_count / 3.0, 1.0) * 15.0, 2)
+
+
+def _score_candidate(payload: Dict, jd: str, required: List[str]) -> Dict:
+    name = payload.get("name", "")
+    skills, years, proj_count, redactions = _candidate_features(payload)
+
+    matched = [s for s in skills if s in required]
+    missing = [s for s in required if s not in skills]
+    extra = [s for s in skills if s not in required]
+
+    # Skill match percent
+    skill_pct = 0.0
+    if required:
+        skill_pct = len(matched) / len(required) * 100.0
+    else:
+        skill_pct = min(len(skills) / max(len(DEFAULT_SKILLS), 1), 1.0) * 100.0
+
     # Scores
     skills_score = round((skill_pct / 100.0) * 60.0, 2)
-    exp_score = round(min(years / 5.0, 1.0) * 25.0, 2)
-    proj_score = round(min(proj_count / 3.0, 1.0) * 15.0, 2)
+    exp_score = _experience_score(years)
+    proj_score = _projects_score(proj_count)
 
     total = round(skills_score + exp_score + proj_score, 2)
 
-    decision = "Shortlist" if total >= 60 else "Reject"
+    decision = "Shortlist" if total >= SHORTLIST_THRESHOLD else "Reject"
 
     strengths = []
     if matched:
@@ -141,35 +697,360 @@ def evaluate_candidate(payload: Dict) -> Dict:
         "strengths": strengths,
         "reasoning": reasoning,
         "timestamp": timestamp,
+        # PII removed before scoring: dropped lines and redacted emails/phones/URLs/dates
+        "redactions": redactions,
     }
+    if payload.get("extraction"):
+        # pages read and any truncation applied while extracting the resume
+        record["extraction"] = payload["extraction"]
+    return record
+
+
+# Commits go through one writer thread per process: concurrent callers queue
+# their records, and the writer persists everything queued so far with one
+# history append and one agentfacts rewrite. Across processes the writes are
+# serialized by a lock file next to agentfacts.json.
+_commit_queue: "queue.Queue" = queue.Queue()
+_commit_thread = None
+_commit_thread_lock = threading.Lock()
+
+
+def _commit_records(records: List[Dict]) -> Dict:
+    """Persist records via the writer thread and return the agentfacts that cover them."""
+    global _commit_thread
+    with span("commit"):
+        future = Future()
+        _commit_queue.put((records, future))
+        with _commit_thread_lock:
+            if _commit_thread is None or not _commit_thread.is_alive():
+                _commit_thread = threading.Thread(target=_commit_writer, name="hiring-commit-writer", daemon=True)
+                _commit_thread.start()
+        return future.result()
+
+
+def _commit_writer():
+    while True:
+        batch = [_commit_queue.get()]
+        while True:
+            try:
+                batch.append(_commit_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            agentfacts = _write_records([r for records, _ in batch for r in records])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+        else:
+            for _, future in batch:
+                future.set_result(agentfacts)
 
-    # persist
-    _append_history(record)
 
-    # build agentfacts
-    agentfacts = load_agentfacts() or {}
-    # append log
+def _write_records(records: List[Dict]) -> Dict:
+    with file_lock(str(AGENTFACTS_PATH)):
+        with span("record_sign"):
+            # each record links to the hash of the one before it (one tail read,
+            # one hash per record) and carries its own HMAC over its canonical form
+            key = ensure_secret_key()
+            prev = _history_head()
+            for record in records:
+                record["prev_hash"] = prev
+                record["signature"] = sign_record(record, key)
+                prev = record_hash(record)
+        # persist (the index is opened first so a first-use rebuild doesn't see these records)
+        index = _skill_index()
+        with span("history_append"):
+            _append_history_batch(records)
+        with span("skill_index"):
+            index.add(records)
+
+        # build agentfacts (a corrupt file raises here instead of being replaced by a fresh log)
+        with span("agentfacts_load"):
+            agentfacts = load_agentfacts(strict=True)
+        with span("merkle"):
+            # append log (sealing a segment every LOG_SEGMENT_SIZE entries)
+            entries = [
+                {"ts": now_iso(), "action": "evaluate", "details": {"id": record['id'], "decision": record['decision'], "score": record['total_score']}}
+                for record in records
+            ]
+            agentfacts["policy_checks"] = {"bias_check": "pass", "data_sanitization": "pass", "scoring_integrity": "pass"}
+            _append_logs(agentfacts, entries)
+        with span("sign"):
+            agentfacts["signature"] = hmac.new(key, agentfacts["merkle_root"].encode(), hashlib.sha256).hexdigest()
+        agentfacts["last_evaluation"] = records[-1]
+
+        with span("agentfacts_write"):
+            _write_agentfacts(agentfacts)
+
+    return agentfacts
+
+
+def _round_exact(values: np.ndarray, ndigits: int) -> np.ndarray:
+    # Python's round() applied per distinct value, so matrix scores equal the scalar path bit for bit
+    uniq, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(v), ndigits) for v in uniq], dtype=np.float64)
+    return rounded[inverse].reshape(values.shape)
+
+
+def score_matrix(candidates: List[Dict], job_descriptions: List[str]) -> Dict:
+    """
+    Score N candidate payloads against M job descriptions without persisting anything.
+
+    Candidates and JDs become count/indicator arrays over DEFAULT_SKILLS, and the
+    matched/missing counts, skill percentages and the 60/25/15 weighted totals
+    are computed as array operations. Every N x M entry equals what
+    evaluate_candidate would report for that pair.
+    """
+    vocab = {s: i for i, s in enumerate(DEFAULT_SKILLS)}
+    n, m = len(candidates), len(job_descriptions)
+
+    counts = np.zeros((n, len(vocab)), dtype=np.int64)
+    n_skills = np.zeros(n, dtype=np.int64)
+    exp_scores = np.zeros(n, dtype=np.float64)
+    proj_scores = np.zeros(n, dtype=np.float64)
+    for i, payload in enumerate(candidates):
+        skills, years, proj_count, _ = _candidate_features(payload)
+        for s in skills:
+            if s in vocab:
+                counts[i, vocab[s]] += 1
+        n_skills[i] = len(skills)
+        exp_scores[i] = _experience_score(years)
+        proj_scores[i] = _projects_score(proj_count)
+
+    required = np.zeros((m, len(vocab)), dtype=np.int64)
+    for j, jd in enumerate(job_descriptions):
+        for s in extract_skills(jd or "", DEFAULT_SKILLS):
+            required[j, vocab[s]] = 1
+    n_required = required.sum(axis=1)
+
+    # skills lists may repeat an entry, and each repeat counts as a match like in the scalar path
+    matched = counts @ required.T
+    missing = n_required[None, :] - (counts > 0).astype(np.int64) @ required.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_required = matched / n_required[None, :] * 100.0
+    pct_no_required = np.minimum(n_skills / max(len(DEFAULT_SKILLS), 1), 1.0) * 100.0
+    skill_pct = np.where(n_required[None, :] > 0, pct_required, pct_no_required[:, None])
+
+    skills_scores = _round_exact((skill_pct / 100.0) * 60.0, 2)
+    totals = _round_exact(skills_scores + exp_scores[:, None] + proj_scores[:, None], 2)
+
+    return {
+        "names": [c.get("name", "") for c in candidates],
+        "job_descriptions": list(job_descriptions),
+        "total_score": totals,
+        "decision": np.where(totals >= SHORTLIST_THRESHOLD, "Shortlist", "Reject"),
+        "skill_match_percent": _round_exact(skill_pct, 1),
+        "skills_score": skills_scores,
+        "experience_score": exp_scores,
+        "projects_score": proj_scores,
+        "matched_count": matched,
+        "missing_count": missing,
+    }
+
+
+def _find_log(logs: List[Dict], record_id: str) -> int:
+    for i in range(len(logs) - 1, -1, -1):
+        if logs[i].get("details", {}).get("id") == record_id:
+            return i
+    return None
+
+
+def get_inclusion_proof(record_id: str, agentfacts: Dict = None) -> Dict:
+    """
+    Audit path proving the log entry for record_id is covered by the signed merkle_root.
+    Entries in sealed segments also carry the segment root, the chain link before
+    it and the segment roots after it. Returns {} when no log entry refers to the record.
+    """
+    if agentfacts is None:
+        agentfacts = load_agentfacts()
     logs = agentfacts.get("logs", [])
-    logs.append({"ts": now_iso(), "action": "evaluate", "details": {"id": record['id'], "decision": decision, "score": total}})
-    agentfacts["logs"] = logs
-    agentfacts["policy_checks"] = {"bias_check": "pass", "data_sanitization": "pass", "scoring_integrity": "pass"}
-    # merkle over logs + policy
-    agentfacts["merkle_root"] = merkle_root(agentfacts["logs"] + [agentfacts["policy_checks"]])
-    # ensure signing key exists
-    key = ensure_secret_key()
-    agentfacts["signature"] = hmac.new(key, agentfacts["merkle_root"].encode(), hashlib.sha256).hexdigest()
-    agentfacts["last_evaluation"] = record
+    head = _head_leaves(agentfacts)
+    leaves = head + logs + [agentfacts.get("policy_checks", {})]
+    proof = {
+        "record_id": record_id,
+        "merkle_root": agentfacts.get("merkle_root"),
+        "signature": agentfacts.get("signature"),
+    }
+    index = _find_log(logs, record_id)
+    if index is not None:
+        index += len(head)
+        proof.update(leaf=logs[index - len(head)], index=index, leaf_count=len(leaves), path=merkle_proof(leaves, index))
+        return proof
+    checkpoints = agentfacts.get("checkpoints") or []
+    for n in range(len(checkpoints) - 1, -1, -1):
+        seg_logs = load_segment(checkpoints[n]["segment"]).get("logs", [])
+        index = _find_log(seg_logs, record_id)
+        if index is None:
+            continue
+        proof.update(
+            leaf=seg_logs[index],
+            index=index,
+            leaf_count=len(seg_logs),
+            path=merkle_proof(seg_logs, index),
+            segment=checkpoints[n]["segment"],
+            segment_root=checkpoints[n]["merkle_root"],
+            chain_prev=checkpoints[n - 1]["chain"] if n else CHAIN_GENESIS,
+            chain_roots=[c["merkle_root"] for c in checkpoints[n + 1:]],
+            checkpoint_path=merkle_proof(leaves, 0),
+        )
+        return proof
+    return {}
 
-    _write_agentfacts(agentfacts)
 
-    return {"record": record, "agentfacts": agentfacts}
+def verify_inclusion_proof(proof: Dict, key: bytes = None) -> bool:
+    # O(log n) per tree: hash the leaf up the path (then, for sealed segments,
+    # along the checkpoint chain into the signed root), then check the HMAC
+    if not proof or proof.get("leaf", {}).get("details", {}).get("id") != proof.get("record_id"):
+        return False
+    try:
+        if "segment" in proof:
+            if not verify_merkle_proof(proof["leaf"], proof.get("path", []), proof.get("segment_root")):
+                return False
+            chain = _chain_step(proof["chain_prev"], proof["segment_root"])
+            for root in proof.get("chain_roots", []):
+                chain = _chain_step(chain, root)
+            if not verify_merkle_proof({"checkpoint": chain}, proof.get("checkpoint_path", []), proof.get("merkle_root")):
+                return False
+        elif not verify_merkle_proof(proof["leaf"], proof.get("path", []), proof.get("merkle_root")):
+            return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    if key is None:
+        key = ensure_secret_key()
+    expected = hmac.new(key, proof["merkle_root"].encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, proof.get("signature") or "")
 
 
-def generate_report_txt(record: Dict, agentfacts: Dict) -> str:
-    return make_txt_report(record, agentfacts)
+def generate_report_txt(record: Dict, agentfacts: Dict, include_proof: bool = False) -> str:
+    proof = None
+    if include_proof:
+        proof = get_inclusion_proof(record.get("id"), agentfacts)
+        if proof:
+            proof["verified"] = verify_inclusion_proof(proof)
+    return make_txt_report(record, agentfacts, proof)
 
 
-def _write_agentfacts(agentfacts: Dict):
-    safe_save_json(str(AGENTFACTS_PATH), agentfacts)
+# ======================== COMMAND LINE ========================
+
+RESUME_SUFFIXES = (".pdf", ".txt")
+
+
+def _iter_ingest_sources(source: Path) -> Iterator[Dict]:
+    # directory of .pdf/.txt resumes, or a JSONL file of evaluate_candidate payloads
+    if source.is_dir():
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(RESUME_SUFFIXES):
+                yield {"path": source / name}
+    else:
+        # every non-blank line yields its payload or an error, tagged with its line number
+        with open(source, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    payload = json.loads(line)
+                except ValueError as exc:
+                    yield {"line": n, "error": {"type": "invalid", "message": f"not valid JSON: {exc}"}}
+                    continue
+                if isinstance(payload, dict):
+                    yield {"line": n, "payload": payload}
+                else:
+                    yield {"line": n, "error": {"type": "invalid", "message": f"expected a JSON object, got {type(payload).__name__}"}}
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest(source: str, job_description: str, out: TextIO, batch_size: int = 64, workers: int = None) -> Dict:
+    """
+    Evaluate every resume in a directory (or payload in a JSONL file) against
+    one job description, batch_size candidates at a time, writing one JSON line
+    per candidate to out as soon as its batch is committed. Unreadable files,
+    JSONL lines that are not a JSON object and payloads that cannot be scored
+    get an error line instead (with "source" or "line" saying which input).
+    """
+    stats = {"evaluated": 0, "errors": 0, "shortlisted": 0}
+    started = time.perf_counter()
+    for chunk in _chunks(_iter_ingest_sources(Path(source)), batch_size):
+        files = [item for item in chunk if "path" in item]
+        ingested = iter(ingest_resumes([(f["path"].name, f["path"].read_bytes()) for f in files], max_workers=workers))
+        payloads, origins = [], []
+        for item in chunk:
+            if "error" in item:
+                out.write(json.dumps({"line": item["line"], "error": item["error"]}) + "\n")
+                stats["errors"] += 1
+                continue
+            if "payload" in item:
+                payloads.append(item["payload"])
+                origins.append({"line": item["line"]})
+                continue
+            res = next(ingested)
+            if res["error"] and not res["text"]:
+                out.write(json.dumps({"name": item["path"].stem, "source": str(item["path"]), "error": res["error"]}) + "\n")
+                stats["errors"] += 1
+                continue
+            payloads.append({"name": item["path"].stem, "resume_text": res["text"], "extraction": res["extraction"],
+                             "redactions": res["redactions"]})
+            origins.append({"source": str(item["path"])})
+        if payloads:
+            # a payload that cannot be scored gets an error line; the rest of the chunk is committed
+            errors = []
+            for record in evaluate_candidates(payloads, job_description, errors=errors)["records"]:
+                out.write(json.dumps(record) + "\n")
+                stats["evaluated"] += 1
+                stats["shortlisted"] += record["decision"] == "Shortlist"
+            for error in errors:
+                out.write(json.dumps({"name": error["name"], **origins[error["index"]], "error": error["error"]}) + "\n")
+                stats["errors"] += 1
+        out.flush()
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["per_second"] = round(stats["evaluated"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m hiring_agent", description="Verified AI Hiring Assistant (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="evaluate a directory of resumes or a JSONL file of payloads")
+    p_ingest.add_argument("source", help="directory of .pdf/.txt resumes, or a .jsonl file of payloads")
+    p_ingest.add_argument("--jd", required=True, help="path to the job description text file")
+    p_ingest.add_argument("--out", default="-", help="JSONL results file, overwritten (default: stdout)")
+    p_ingest.add_argument("--append", action="store_true", help="append to --out instead of overwriting it")
+    p_ingest.add_argument("--batch-size", type=int, default=64, help="candidates persisted and signed per batch")
+    p_ingest.add_argument("--workers", type=int, default=None, help="concurrent PDF extractions")
+    p_ingest.add_argument("--metrics", default=None, help="write per-stage timings here (Prometheus text) when done")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        if args.metrics:
+            metrics.enable()
+        jd = Path(args.jd).read_text(encoding="utf-8")
+        out = sys.stdout if args.out == "-" else open(args.out, "a" if args.append else "w", encoding="utf-8")
+        try:
+            stats = ingest(args.source, jd, out, batch_size=max(args.batch_size, 1), workers=args.workers)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(
+            f"evaluated {stats['evaluated']} candidates ({stats['shortlisted']} shortlisted, "
+            f"{stats['errors']} failed) in {stats['seconds']}s - {stats['per_second']} candidates/s",
+            file=sys.stderr,
+        )
+        if args.metrics:
+            Path(args.metrics).write_text(metrics.prometheus_text(), encoding="utf-8")
+    return 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
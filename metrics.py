@@ -0,0 +1,146 @@
+"""
+Per-stage timing for the evaluation pipeline.
+
+    with span("sanitize"):
+        ...
+
+Spans feed one latency histogram per stage, readable in-process through
+snapshot() or as Prometheus text through prometheus_text(). Instrumentation
+is off unless HIRING_METRICS=1 (or enable() is called); while off, span()
+hands back a shared no-op context manager and records nothing.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List
+
+# upper bounds in seconds, Prometheus-style; a +Inf bucket is implied
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_NAME = "hiring_stage_duration_seconds"
+
+_enabled = os.environ.get("HIRING_METRICS", "0") == "1"
+_lock = threading.Lock()
+_histograms: Dict[str, "Histogram"] = {}
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-th observation (max for the +Inf bucket)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage: str):
+    """Context manager timing one stage; free when instrumentation is off."""
+    return _Span(stage) if _enabled else _NOOP
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def observe(stage: str, seconds: float):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(seconds)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot() -> Dict[str, Dict]:
+    """Per-stage count, sum/mean/max seconds, bucket-estimated p50/p99 and cumulative buckets."""
+    out = {}
+    with _lock:
+        for stage, hist in sorted(_histograms.items()):
+            cumulative, running = {}, 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                running += n
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = hist.count
+            out[stage] = {
+                "count": hist.count,
+                "sum": hist.total,
+                "mean": hist.total / hist.count if hist.count else 0.0,
+                "max": hist.max,
+                "p50": hist.quantile(0.5),
+                "p99": hist.quantile(0.99),
+                "buckets": cumulative,
+            }
+    return out
+
+
+def prometheus_text() -> str:
+    """All stage histograms in the Prometheus text exposition format."""
+    lines: List[str] = [
+        f"# HELP {METRIC_NAME} Time spent in each stage of candidate evaluation.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for stage, stats in snapshot().items():
+        label = stage.replace("\\", "\\\\").replace('"', '\\"')
+        for bound, n in stats["buckets"].items():
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound}"}} {n}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {stats["sum"]:.9f}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,427 @@
+"""
+HTTP service for the Verified AI Hiring Assistant.
+
+Built on asyncio's stream server (standard library only):
+
+    python service.py --host 127.0.0.1 --port 8080
+
+Endpoints (JSON in, JSON out):
+  POST /evaluate         one evaluate_candidate payload
+  POST /evaluate/batch   {"candidates": [payload, ...], "job_description": optional}
+  GET  /history          ?decision=&sort_by=&ascending=&limit=&offset=&skills=a,b&exclude=c
+  GET  /history/recent   ?n= newest history records (tail read)
+  GET  /logs/recent      ?n= newest activity log entries (tail read)
+  GET  /verify           ?id=<record id> for an inclusion proof; no id checks the signed root
+  GET  /metrics          per-stage timing histograms, Prometheus text format
+
+A payload may carry "resume_file": {"filename", "content_base64"} in place of
+resume_text; files are extracted with utils.ingest_resumes on a worker thread.
+Evaluations arriving within the batch window are scored and committed
+together: one history append, one Merkle update and one signature.
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from hiring_agent import (
+    evaluate_candidates,
+    query_history,
+    history_stats,
+    query_skills,
+    load_agentfacts,
+    get_inclusion_proof,
+    log_size,
+    tail_history,
+    tail_logs,
+    verify_inclusion_proof,
+)
+from utils import ingest_resumes, ensure_secret_key, MAX_UPLOAD_BYTES
+import metrics
+
+HOST = os.environ.get("HIRING_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.environ.get("HIRING_SERVICE_PORT", "8080"))
+# evaluations arriving this close together share one persistence/signing cycle
+BATCH_WINDOW_MS = float(os.environ.get("HIRING_BATCH_WINDOW_MS", "10"))
+BATCH_MAX = int(os.environ.get("HIRING_BATCH_MAX", "256"))
+# base64 inflates uploads by 4/3; leave room for several files per batch request
+MAX_BODY_BYTES = int(os.environ.get("HIRING_MAX_BODY_BYTES", str(8 * MAX_UPLOAD_BYTES)))
+# cap on n for the /history/recent and /logs/recent tail reads
+TAIL_MAX = 1000
+_MAX_HEADERS = 100
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+            500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MicroBatcher:
+    """
+    Collects evaluation requests for up to `window` seconds (or until
+    max_batch payloads are waiting) and commits them with a single
+    evaluate_candidates call on the executor. Payloads that fail to score
+    come back as errors to the request that sent them.
+    """
+
+    def __init__(self, window: float, max_batch: int, executor: ThreadPoolExecutor):
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self._pending: List[Tuple[List[Dict], asyncio.Future]] = []
+        self._count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, payloads: List[Dict]) -> Dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payloads, future))
+        self._count += len(payloads)
+        if self._count >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._count = self._pending, [], 0
+        if batch:
+            asyncio.ensure_future(self._commit(batch))
+
+    async def _commit(self, batch: List[Tuple[List[Dict], asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        payloads = [p for group, _ in batch for p in group]
+        # a payload that cannot be scored is reported to its own request only
+        errors: List[Dict] = []
+        try:
+            out = await loop.run_in_executor(self.executor, partial(evaluate_candidates, payloads, errors=errors))
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        agentfacts = out["agentfacts"]
+        failed = {e["index"]: e for e in errors}
+        records = iter(out["records"])
+        start = 0
+        for group, future in batch:
+            result = {"records": [], "errors": [], "merkle_root": agentfacts.get("merkle_root"),
+                      "signature": agentfacts.get("signature")}
+            for i in range(len(group)):
+                if start + i in failed:
+                    result["errors"].append(dict(failed[start + i], index=i))
+                else:
+                    result["records"].append(next(records))
+            start += len(group)
+            if not future.done():
+                future.set_result(result)
+
+
+class HiringService:
+    def __init__(self, window_ms: float = BATCH_WINDOW_MS, max_batch: int = BATCH_MAX):
+        # scoring/commits and file extraction get separate pools so a slow
+        # PDF never holds up a batch that is ready to be signed
+        self.commit_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hiring-commit")
+        self.io_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="hiring-io")
+        self.batcher = MicroBatcher(window_ms / 1000.0, max(max_batch, 1), self.commit_executor)
+        self.routes = {
+            "/evaluate": ("POST", self.evaluate),
+            "/evaluate/batch": ("POST", self.evaluate_batch),
+            "/history": ("GET", self.history),
+            "/history/recent": ("GET", self.recent_history),
+            "/logs/recent": ("GET", self.recent_logs),
+            "/verify": ("GET", self.verify),
+            "/metrics": ("GET", self.metrics),
+        }
+
+    async def start(self, host: str = HOST, port: int = PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.commit_executor.shutdown(wait=True)
+        self.io_executor.shutdown(wait=False)
+
+    # ---------------- endpoints ----------------
+
+    async def evaluate(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        payload = _json_body(body)
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "expected a JSON object")
+        payloads, errors = await self._prepare([payload])
+        if errors:
+            raise HTTPError(422, errors[0]["error"]["message"])
+        out = await self.batcher.submit(payloads)
+        if out["errors"]:
+            raise HTTPError(422, out["errors"][0]["error"]["message"])
+        return 200, {"record": out["records"][0], "merkle_root": out["merkle_root"], "signature": out["signature"]}
+
+    async def evaluate_batch(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        data = _json_body(body)
+        candidates = data.get("candidates") if isinstance(data, dict) else None
+        if not isinstance(candidates, list) or not all(isinstance(c, dict) for c in candidates):
+            raise HTTPError(400, "expected {\"candidates\": [object, ...]}")
+        jd = data.get("job_description")
+        if jd is not None:
+            candidates = [dict(c, job_description=jd) for c in candidates]
+        payloads, errors = await self._prepare(candidates)
+        out = {"records": [], "errors": [], "merkle_root": None, "signature": None}
+        if payloads:
+            out = await self.batcher.submit(payloads)
+        # scoring errors are indexed within payloads; map them back to the request's candidates
+        skipped = {e["index"] for e in errors}
+        slots = [i for i in range(len(candidates)) if i not in skipped]
+        errors += [dict(e, index=slots[e["index"]]) for e in out["errors"]]
+        errors.sort(key=lambda e: e["index"])
+        return 200, dict(out, errors=errors)
+
+    async def history(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        skills, exclude = _list_param(query, "skills"), _list_param(query, "exclude")
+        kwargs = {
+            "decision": _param(query, "decision"),
+            "sort_by": _param(query, "sort_by") or "total_score",
+            "ascending": (_param(query, "ascending") or "").lower() in ("1", "true", "yes"),
+            "limit": _int_param(query, "limit", 50),
+            "offset": _int_param(query, "offset", 0),
+        }
+
+        def run():
+            ids = query_skills(all_of=skills, none_of=exclude) if (skills or exclude) else None
+            stats = history_stats(decision=kwargs["decision"], ids=ids)
+            return {"total": stats["count"], "items": query_history(ids=ids, **kwargs)}
+
+        loop = asyncio.get_running_loop()
+        try:
+            return 200, await loop.run_in_executor(self.io_executor, run)
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+
+    async def recent_history(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        n = min(_int_param(query, "n", 20), TAIL_MAX)
+        loop = asyncio.get_running_loop()
+        items = await loop.run_in_executor(self.io_executor, tail_history, n)
+        return 200, {"items": items[::-1]}
+
+    async def recent_logs(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        n = min(_int_param(query, "n", 20), TAIL_MAX)
+        loop = asyncio.get_running_loop()
+        items = await loop.run_in_executor(self.io_executor, tail_logs, n)
+        return 200, {"items": items[::-1]}
+
+    async def verify(self, query: Dict, body: bytes) -> Tuple[int, Dict]:
+        record_id = _param(query, "id")
+        loop = asyncio.get_running_loop()
+        if record_id:
+            proof = await loop.run_in_executor(self.io_executor, get_inclusion_proof, record_id)
+            if not proof:
+                raise HTTPError(404, f"no log entry for record {record_id}")
+            return 200, {"verified": verify_inclusion_proof(proof), "proof": proof}
+        agentfacts = await loop.run_in_executor(self.io_executor, load_agentfacts)
+        root, signature = agentfacts.get("merkle_root"), agentfacts.get("signature")
+        valid = False
+        if root and signature:
+            expected = hmac.new(ensure_secret_key(), root.encode(), hashlib.sha256).hexdigest()
+            valid = hmac.compare_digest(expected, signature)
+        return 200, {
+            "verified": valid,
+            "merkle_root": root,
+            "signature": signature,
+            "log_entries": log_size(agentfacts),
+            "segments": len(agentfacts.get("checkpoints") or []),
+        }
+
+    async def metrics(self, query: Dict, body: bytes) -> Tuple[int, str]:
+        return 200, metrics.prometheus_text()
+
+    async def _prepare(self, payloads: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        # decode attached resume files and extract them off the event loop
+        files, slots = [], []
+        for i, payload in enumerate(payloads):
+            attached = payload.get("resume_file")
+            if attached is None:
+                continue
+            if not isinstance(attached, dict) or "content_base64" not in attached:
+                raise HTTPError(400, f"candidate {i}: resume_file needs filename and content_base64")
+            try:
+                data = base64.b64decode(attached["content_base64"], validate=True)
+            except (binascii.Error, TypeError):
+                raise HTTPError(400, f"candidate {i}: resume_file is not valid base64")
+            files.append((str(attached.get("filename") or "resume.pdf"), data))
+            slots.append(i)
+        results = []
+        if files:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.io_executor, partial(ingest_resumes, files))
+        extracted = dict(zip(slots, results))
+
+        ready, errors = [], []
+        for i, payload in enumerate(payloads):
+            payload = {k: v for k, v in payload.items() if k != "resume_file"}
+            res = extracted.get(i)
+            if res is not None:
+                if res["error"] and not res["text"]:
+                    errors.append({"index": i, "name": payload.get("name") or res["name"], "error": res["error"]})
+                    continue
+                payload["resume_text"] = res["text"]
+                payload["extraction"] = res["extraction"]
+                payload["redactions"] = res["redactions"]
+                payload.setdefault("name", os.path.splitext(res["name"])[0])
+            ready.append(payload)
+        return ready, errors
+
+    # ---------------- HTTP/1.1 plumbing ----------------
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, keep_alive, body = request
+                    status, payload = await self._dispatch(method, target, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"error": exc.message}
+                except Exception as exc:
+                    status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            raise HTTPError(404, f"no such endpoint: {url.path}")
+        allowed, handler = route
+        if method != allowed:
+            raise HTTPError(405, f"{url.path} only accepts {allowed}")
+        return await handler(parse_qs(url.query), body)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bool, bytes]]:
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= _MAX_HEADERS:
+            raise HTTPError(400, "too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    if "transfer-encoding" in headers:
+        raise HTTPError(411, "chunked bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"request body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, keep_alive, body
+
+
+def _response(status: int, payload, keep_alive: bool) -> bytes:
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _json_body(body: bytes):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise HTTPError(400, "request body is not valid JSON")
+
+
+def _param(query: Dict, name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values else None
+
+
+def _list_param(query: Dict, name: str) -> List[str]:
+    return [s.strip() for v in query.get(name, []) for s in v.split(",") if s.strip()]
+
+
+def _int_param(query: Dict, name: str, default: int) -> int:
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+
+
+async def serve(host: str = HOST, port: int = PORT, window_ms: float = BATCH_WINDOW_MS, max_batch: int = BATCH_MAX):
+    service = HiringService(window_ms, max_batch)
+    server = await service.start(host, port)
+    print(f"Serving on http://{host}:{port} (batch window {window_ms} ms, max {max_batch})", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python service.py", description="Verified AI Hiring Assistant HTTP service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="how long to gather evaluations into one commit")
+    parser.add_argument("--batch-max", type=int, default=BATCH_MAX, help="flush a batch early at this many candidates")
+    parser.add_argument("--metrics", action="store_true", help="record per-stage timings for GET /metrics (or set HIRING_METRICS=1)")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    try:
+        asyncio.run(serve(args.host, args.port, args.batch_window_ms, args.batch_max))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,53 @@
 import re
+import io
 import json
 import os
 import hmac
 import hashlib
+import queue
+import subprocess
+import sys
+import threading
+import time
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Any
+from functools import lru_cache, partial
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from pathlib import Path
-from PyPDF2 import PdfReader
+from PyPDF2 import PdfReader, __version__ as PYPDF2_VERSION
+from metrics import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 BASE_DIR = Path(__file__).resolve().parent
 SECRET_KEY_FILE = BASE_DIR / "secret.key"
 
+# concurrent PDF extractions in ingest_resumes; 0 means one per CPU
+INGEST_WORKERS = int(os.environ.get("HIRING_INGEST_WORKERS", "0") or 0)
+
+# extracted-text cache for PDFs; a size of 0 disables it
+PDF_CACHE_DIR = Path(os.environ.get("HIRING_PDF_CACHE_DIR", str(BASE_DIR / ".pdf_cache")))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("HIRING_PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# extraction limits; uploads over MAX_UPLOAD_BYTES are rejected unparsed
+MAX_UPLOAD_BYTES = int(os.environ.get("HIRING_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.environ.get("HIRING_PDF_MAX_PAGES", "50"))
+MAX_RESUME_CHARS = int(os.environ.get("HIRING_MAX_RESUME_CHARS", "200000"))
+
+# PDFs are parsed in a subprocess killed after PDF_TIMEOUT seconds or PDF_MAX_RSS_MB of RSS
+PDF_SANDBOX = os.environ.get("HIRING_PDF_SANDBOX", "1") != "0"
+PDF_TIMEOUT = float(os.environ.get("HIRING_PDF_TIMEOUT", "20"))
+PDF_MAX_RSS_MB = int(os.environ.get("HIRING_PDF_MAX_RSS_MB", "512"))
+_SANDBOX_POLL_INTERVAL = 0.05
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
 # Skill list specified by the user requirements
 DEFAULT_SKILLS = [
     "python", "java", "sql", "aws", "docker", "react", "ml", "ai", "api",
@@ -22,12 +59,36 @@ def now_iso() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+_secret_keys: Dict[str, bytes] = {}
+
+
 def ensure_secret_key() -> bytes:
+    # read (or created) once per process and key file, then served from memory
+    path = str(SECRET_KEY_FILE)
+    key = _secret_keys.get(path)
+    if key is None:
+        key = _secret_keys[path] = _load_secret_key()
+    return key
+
+
+def _load_secret_key() -> bytes:
     if SECRET_KEY_FILE.exists():
         return SECRET_KEY_FILE.read_bytes()
-    key = os.urandom(32)
-    SECRET_KEY_FILE.write_bytes(key)
-    return key
+    # write a complete temp key, then link it into place: if another process
+    # created the key first, link fails and everyone signs with that one
+    fd, tmp = tempfile.mkstemp(dir=str(SECRET_KEY_FILE.parent), prefix=".secret.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, str(SECRET_KEY_FILE))
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp)
+    return SECRET_KEY_FILE.read_bytes()
 
 
 def sign_string(key: str, message: str) -> str:
@@ -37,9 +98,44 @@ def sign_string(key: str, message: str) -> str:
     return sig
 
 
+# sorted keys, no whitespace, UTF-8: the bytes a record signature covers
+_canonical_record_json = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode
+
+
+def canonical_record(record: dict) -> bytes:
+    return _canonical_record_json({k: v for k, v in record.items() if k != "signature"}).encode("utf-8")
+
+
+@lru_cache(maxsize=8)
+def _record_hmac(key: bytes):
+    # keyed HMAC state, built once per key and copied for each record
+    return hmac.new(key, digestmod="sha256")
+
+
+def sign_record(record: dict, key: bytes = None) -> str:
+    """HMAC-SHA256 over canonical_record(record), i.e. every field except "signature"."""
+    h = _record_hmac(key or ensure_secret_key()).copy()
+    h.update(canonical_record(record))
+    return h.hexdigest()
+
+
+def verify_record(record: dict, key: bytes = None) -> bool:
+    signature = record.get("signature")
+    return bool(signature) and hmac.compare_digest(sign_record(record, key), signature)
+
+
+def record_hash(record: dict) -> str:
+    # history chain link: SHA-256 over the whole canonical record, prev_hash and signature included
+    return hashlib.sha256(_canonical_record_json(record).encode("utf-8")).hexdigest()
+
+
+# json.dumps(..., sort_keys=True) without building a new encoder per call
+_canonical_json = json.JSONEncoder(sort_keys=True).encode
+
+
 def merkle_root(items: List[Any]) -> str:
     # items: list of serializable objects -> string leaves
-    leaves = [json.dumps(i, sort_keys=True) for i in items]
+    leaves = [_canonical_json(i) for i in items]
     if not leaves:
         return hashlib.sha256(b"").hexdigest()
     nodes = [hashlib.sha256(l.encode("utf-8")).digest() for l in leaves]
@@ -53,54 +149,943 @@ def merkle_root(items: List[Any]) -> str:
     return nodes[0].hex()
 
 
-def safe_load_json(path: str, default=None):
+def _leaf_hash(item: Any) -> bytes:
+    return hashlib.sha256(_canonical_json(item).encode("utf-8")).digest()
+
+
+class MerkleAccumulator:
+    """Append-only Merkle tree that keeps only the right-edge (frontier) hashes.
+
+    ``frontier[k]`` holds the root of the complete 2**k-leaf subtree whenever bit k
+    of ``size`` is set. Appends and roots are O(log n) and the root matches
+    ``merkle_root`` over the same items, including its odd-node duplication rule.
+    """
+
+    def __init__(self, size: int = 0, frontier: List[Any] = None):
+        self.size = size
+        self.frontier = list(frontier or [])
+
+    @classmethod
+    def from_items(cls, items: List[Any]) -> "MerkleAccumulator":
+        acc = cls()
+        for item in items:
+            acc.append(item)
+        return acc
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "MerkleAccumulator":
+        frontier = [bytes.fromhex(h) if h else None for h in state.get("frontier", [])]
+        return cls(int(state.get("size", 0)), frontier)
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "frontier": [h.hex() if h else None for h in self.frontier]}
+
+    def copy(self) -> "MerkleAccumulator":
+        return MerkleAccumulator(self.size, self.frontier)
+
+    def append(self, item: Any):
+        self.append_hash(_leaf_hash(item))
+
+    def append_hash(self, node: bytes):
+        k = 0
+        while (self.size >> k) & 1:
+            node = hashlib.sha256(self.frontier[k] + node).digest()
+            self.frontier[k] = None
+            k += 1
+        if k == len(self.frontier):
+            self.frontier.append(node)
+        else:
+            self.frontier[k] = node
+        self.size += 1
+
+    def root(self, extra: List[Any] = None) -> str:
+        # extra items are hashed as trailing leaves without being appended
+        acc = self
+        if extra:
+            acc = self.copy()
+            for item in extra:
+                acc.append(item)
+        return acc._root()
+
+    def _root(self) -> str:
+        n = self.size
+        if not n:
+            return hashlib.sha256(b"").hexdigest()
+        carry = None
+        k = 0
+        while (1 << k) < n:
+            full = self.frontier[k] if (n >> k) & 1 else None
+            if full is not None and carry is not None:
+                carry = hashlib.sha256(full + carry).digest()
+            elif full is not None:
+                carry = hashlib.sha256(full + full).digest()
+            elif carry is not None:
+                carry = hashlib.sha256(carry + carry).digest()
+            k += 1
+        return (carry if carry is not None else self.frontier[k]).hex()
+
+
+def merkle_proof(items: List[Any], index: int) -> List[dict]:
+    # audit path for items[index] under merkle_root(items); "side" is where the sibling sits
+    nodes = [_leaf_hash(i) for i in items]
+    path = []
+    while len(nodes) > 1:
+        if len(nodes) % 2 == 1:
+            nodes.append(nodes[-1])
+        sib = index ^ 1
+        path.append({"hash": nodes[sib].hex(), "side": "left" if sib < index else "right"})
+        nodes = [hashlib.sha256(nodes[i] + nodes[i+1]).digest() for i in range(0, len(nodes), 2)]
+        index //= 2
+    return path
+
+
+def verify_merkle_proof(item: Any, path: List[dict], root: str) -> bool:
+    node = _leaf_hash(item)
+    for step in path:
+        sib = bytes.fromhex(step["hash"])
+        if step["side"] == "left":
+            node = hashlib.sha256(sib + node).digest()
+        else:
+            node = hashlib.sha256(node + sib).digest()
+    return hmac.compare_digest(node.hex(), root or "")
+
+
+def safe_load_json(path: str, default=None, strict: bool = False):
+    # strict: a missing file still gives default, but an unreadable one raises
+    # instead of being treated as empty (and then overwritten)
     try:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
+    except FileNotFoundError:
+        return default
     except Exception:
+        if strict:
+            raise
         return default
 
 
 def safe_save_json(path: str, data: Any):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    # write a sibling temp file and swap it in with os.replace, so readers and
+    # crashes only ever see the old or the new file, never a partial one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if fcntl is not None:
+        # persist the rename itself
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on `<path>.lock`, held across threads and processes for the with-block."""
+    with open(f"{path}.lock", "a+b") as f:
+        with span("lock_wait"):
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                        continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_signature(*paths) -> Tuple:
+    # (path, inode, mtime_ns, size) per file; changes whenever a file is rewritten, appended or removed
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((str(path), st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((str(path), None, None, None))
+    return tuple(sig)
+
+
+def iter_jsonl(path: str) -> Iterator[Any]:
+    # one JSON document per line; a torn trailing line from a crashed append is skipped
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def read_jsonl(path: str) -> List[Any]:
+    return list(iter_jsonl(path))
+
+
+def tail_jsonl(path: str, n: int, block_size: int = 64 * 1024) -> List[Any]:
+    """
+    Last n documents of a JSONL file, oldest first. Blocks are read backwards
+    from the end until n lines have parsed, so the cost depends on n and the
+    line length, not on the file size. Unparseable lines are skipped as in iter_jsonl.
+    """
+    if n <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    out = []
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        carry = b""
+        while pos > 0 and len(out) < n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + carry).split(b"\n")
+            # the first piece may be the end of a line that starts in an earlier block
+            carry = lines.pop(0) if pos else b""
+            for line in reversed(lines):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(out) == n:
+                    break
+    out.reverse()
+    return out
+
+
+def append_jsonl(path: str, items: List[Any]):
+    data = "".join(json.dumps(i) + "\n" for i in items).encode("utf-8")
+    if not data:
+        return
+    with open(path, "ab+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            # terminate a torn line left by an interrupted append before writing
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class PdfTextCache:
+    """
+    Content-addressed on-disk cache of extracted PDF text, as scrub_pii left it.
+
+    Only scrubbed text and its redaction counts are stored, never the raw
+    resume. Keys combine the SHA-256 of the file bytes with the PyPDF2 version
+    and the extraction options, so a parser upgrade never serves stale text.
+    Entry mtimes are refreshed on every hit and the least recently used
+    entries are evicted once the directory grows past max_bytes (0 disables
+    the cache). Entries written by earlier versions held raw text; they are
+    deleted by the next eviction pass.
+    """
+
+    SUFFIX = ".scrubbed.json"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def key(self, data: bytes, **options) -> str:
+        opts = json.dumps({"pypdf2": PYPDF2_VERSION, **options}, sort_keys=True)
+        return f"{hashlib.sha256(data).hexdigest()}-{hashlib.sha256(opts.encode()).hexdigest()[:16]}"
+
+    def get(self, key: str) -> Optional[dict]:
+        if self.max_bytes <= 0:
+            return None
+        path = self.directory / f"{key}{self.SUFFIX}"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        if self.max_bytes <= 0:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{key}{self.SUFFIX}"
+            tmp = self.directory / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for e in os.scandir(self.directory):
+            if e.name.endswith(self.SUFFIX):
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+            elif e.name.endswith(".json"):
+                # raw-text entry from before the cache held scrubbed text only
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+PDF_TEXT_CACHE = PdfTextCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+
+
+def _file_bytes(file) -> bytes:
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, Path)):
+        return Path(file).read_bytes()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    return file.read()
+
+
+def iter_pdf_pages(data: bytes, max_pages: int = None, max_chars: int = None, stats: dict = None) -> Iterator[str]:
+    """
+    Yield the text of each page as it is parsed, stopping after max_pages pages
+    or max_chars characters (the page that crosses the limit is cut). When
+    given, stats is filled with total_pages and truncated (None, "max_pages"
+    or "max_chars").
+    """
+    reader = PdfReader(io.BytesIO(data))
+    if stats is not None:
+        stats.update(total_pages=len(reader.pages), truncated=None)
+    used = 0
+    for i, page in enumerate(reader.pages):
+        if max_pages is not None and i >= max_pages:
+            if stats is not None:
+                stats["truncated"] = "max_pages"
+            return
+        text = page.extract_text() or ""
+        if max_chars is not None and used + len(text) > max_chars:
+            if stats is not None:
+                stats["truncated"] = "max_chars"
+            yield text[:max_chars - used]
+            return
+        used += len(text)
+        yield text
+
+
+def _pdf_too_large(data: bytes) -> Optional[dict]:
+    # the max_bytes rejection; checked before any cache lookup and never cached,
+    # so it always follows the current MAX_UPLOAD_BYTES
+    if MAX_UPLOAD_BYTES and len(data) > MAX_UPLOAD_BYTES:
+        return {"text": "", "pages": 0, "total_pages": None, "truncated": "max_bytes", "error": None}
+    return None
+
+
+def extract_pdf(data: bytes, max_pages: int = PDF_MAX_PAGES, max_chars: int = MAX_RESUME_CHARS) -> dict:
+    """
+    Bounded PDF text extraction.
+
+    Returns {"text", "pages", "total_pages", "truncated", "error"}, where
+    error is None or {"type", "message"}. Uploads larger than MAX_UPLOAD_BYTES
+    are not parsed; a parse error keeps the text of the pages read before it.
+    """
+    rejected = _pdf_too_large(data)
+    if rejected:
+        return rejected
+    stats = {}
+    pages = []
+    error = None
+    try:
+        for text in iter_pdf_pages(data, max_pages, max_chars, stats):
+            pages.append(text)
+    except Exception as e:
+        error = {"type": "parse", "message": f"{type(e).__name__}: {e}"}
+    return {
+        "text": "\n".join(pages),
+        "pages": len(pages),
+        "total_pages": stats.get("total_pages"),
+        "truncated": stats.get("truncated"),
+        "error": error,
+    }
+
+
+def _process_rss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _sandbox_main():
+    """
+    Entry point of the extraction subprocess (see extract_pdf_sandboxed): reads
+    an options line and the PDF bytes from stdin and writes one JSON message
+    per line to stdout as pages are parsed.
+    """
+    stdin, out = sys.stdin.buffer, sys.stdout
+
+    def send(kind: str, value):
+        out.write(json.dumps([kind, value]) + "\n")
+        out.flush()
+
+    try:
+        opts = json.loads(stdin.readline())
+        data = stdin.read()
+        stats = {}
+        for text in iter_pdf_pages(data, opts["max_pages"], opts["max_chars"], stats):
+            send("page", text)
+        send("done", stats)
+    except MemoryError:
+        send("error", {"type": "memory", "message": "MemoryError while parsing"})
+    except Exception as e:
+        send("error", {"type": "parse", "message": f"{type(e).__name__}: {e}"})
+
+
+def _sandbox_pump(proc: subprocess.Popen, request: bytes, messages: "queue.Queue"):
+    # feeds the worker its input, then forwards its output lines; None marks the end
+    try:
+        proc.stdin.write(request)
+        proc.stdin.close()
+        for line in proc.stdout:
+            messages.put(json.loads(line))
+    except (OSError, ValueError):
+        pass
+    finally:
+        messages.put(None)
+
+
+def extract_pdf_sandboxed(data: bytes, max_pages: int = PDF_MAX_PAGES, max_chars: int = MAX_RESUME_CHARS,
+                          timeout: float = PDF_TIMEOUT, max_rss_mb: int = PDF_MAX_RSS_MB) -> dict:
+    """
+    extract_pdf in a throwaway subprocess with a wall-clock timeout and an RSS cap.
+
+    The worker is a fresh interpreter running _sandbox_main, so it neither
+    inherits the caller's threads and locks (as a fork would) nor re-runs the
+    caller's __main__ (as multiprocessing's spawn does, e.g. a whole Streamlit
+    script). Pages are streamed back as they are parsed, so a worker that is
+    killed for exceeding timeout or max_rss_mb (RSS is polled via /proc where
+    available) still returns the text read so far, with error type "timeout"
+    or "memory". A worker that dies outright reports "crash".
+    """
+    rejected = _pdf_too_large(data)
+    if rejected:
+        return rejected
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import utils; utils._sandbox_main()"],
+        cwd=str(BASE_DIR), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    request = json.dumps({"max_pages": max_pages, "max_chars": max_chars}).encode() + b"\n" + data
+    messages: "queue.Queue" = queue.Queue()
+    pump = threading.Thread(target=_sandbox_pump, args=(proc, request, messages), daemon=True)
+    pump.start()
+    max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+    deadline = time.monotonic() + timeout
+    pages = []
+    stats = {}
+    error = None
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                error = {"type": "timeout", "message": f"extraction exceeded {timeout:g}s"}
+                break
+            if max_rss is not None:
+                rss = _process_rss(proc.pid)
+                if rss is not None and rss > max_rss:
+                    error = {"type": "memory", "message": f"extraction exceeded {max_rss_mb} MB RSS"}
+                    break
+            try:
+                message = messages.get(timeout=min(remaining, _SANDBOX_POLL_INTERVAL))
+            except queue.Empty:
+                continue
+            if message is None:
+                proc.wait(1)
+                error = {"type": "crash", "message": f"extraction worker exited with code {proc.returncode}"}
+                break
+            kind, value = message
+            if kind == "page":
+                pages.append(value)
+            elif kind == "done":
+                stats = value
+                break
+            else:
+                error = value
+                break
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        pump.join()
+        proc.stdout.close()
+    return {
+        "text": "\n".join(pages),
+        "pages": len(pages),
+        "total_pages": stats.get("total_pages"),
+        "truncated": stats.get("truncated"),
+        "error": error,
+    }
+
+
+def _extract_pdf_isolated(data: bytes, max_pages: int, max_chars: int) -> dict:
+    # timed in the calling process
+    with span("pdf_extract"):
+        if PDF_SANDBOX:
+            return extract_pdf_sandboxed(data, max_pages, max_chars)
+        return extract_pdf(data, max_pages, max_chars)
 
 
 def extract_text_from_pdf(file) -> str:
+    # raw text, never cached (the cache only holds scrubbed text; see ingest_resumes)
+    with span("extract_text_from_pdf"):
+        try:
+            data = _file_bytes(file)
+        except Exception:
+            return ""
+        return _extract_pdf_isolated(data, PDF_MAX_PAGES, MAX_RESUME_CHARS)["text"]
+
+
+def _is_pdf(name: str, data: bytes) -> bool:
+    return name.lower().endswith(".pdf") or data[:5] == b"%PDF-"
+
+
+def _extract_plain(data: bytes, max_chars: int = MAX_RESUME_CHARS) -> dict:
+    if MAX_UPLOAD_BYTES and len(data) > MAX_UPLOAD_BYTES:
+        return {"text": "", "pages": None, "total_pages": None, "truncated": "max_bytes", "error": None}
     try:
-        reader = PdfReader(file)
-        pages = [p.extract_text() or "" for p in reader.pages]
-        return "\n".join(pages)
+        text = data.decode("utf-8")
     except Exception:
-        return ""
+        text = str(data)
+    truncated = None
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = "max_chars"
+    return {"text": text, "pages": None, "total_pages": None, "truncated": truncated, "error": None}
 
 
-def sanitize_text(text: str) -> str:
+def ingest_resumes(files: List[Tuple[str, bytes]], max_workers: int = None,
+                   max_pages: int = PDF_MAX_PAGES, max_chars: int = MAX_RESUME_CHARS) -> List[dict]:
+    """
+    Extract and sanitize resume text for (name, bytes) pairs.
+
+    PDFs already in PDF_TEXT_CACHE are served from it; the rest are parsed in
+    up to max_workers concurrent sandboxed subprocesses (default
+    INGEST_WORKERS, then the CPU count) and cached only after scrub_pii, so
+    raw resume text never reaches the disk. Results keep the input order and
+    carry "text", "error", "extraction" (pages read and any truncation) and
+    "redactions" (PII removed by scrub_pii); a
+    file that fails or times out reports its error instead of aborting the
+    batch.
+    """
+    files = list(files)
+    done = [None] * len(files)
+    pending = []
+    for i, (name, data) in enumerate(files):
+        if not _is_pdf(name, data):
+            done[i] = _scrubbed(_extract_plain(data, max_chars))
+            continue
+        rejected = _pdf_too_large(data)
+        if rejected:
+            done[i] = _scrubbed(rejected)
+            continue
+        key = PDF_TEXT_CACHE.key(data, max_pages=max_pages, max_chars=max_chars, scrubber=PII_SCRUBBER_VERSION)
+        cached = PDF_TEXT_CACHE.get(key)
+        if cached is not None:
+            done[i] = cached
+        else:
+            pending.append((i, key))
+    workers = min(max_workers or INGEST_WORKERS or os.cpu_count() or 1, len(pending))
+    blobs = [files[i][1] for i, _ in pending]
+    extract = partial(_extract_pdf_isolated, max_pages=max_pages, max_chars=max_chars)
+    if workers <= 1:
+        parsed = [extract(b) for b in blobs]
+    else:
+        # sandboxed extractions are separate processes the threads only wait on;
+        # with the sandbox off, PDFs are parsed in-process on these threads
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(extract, blobs))
+    for (i, key), res in zip(pending, parsed):
+        done[i] = _scrubbed(res)
+        if res["error"] is None:
+            PDF_TEXT_CACHE.put(key, done[i])
+    return [
+        {
+            "name": name,
+            "text": res["text"],
+            "error": res["error"],
+            "extraction": {k: res[k] for k in ("pages", "total_pages", "truncated")},
+            "redactions": res["redactions"],
+        }
+        for (name, _), res in zip(files, done)
+    ]
+
+
+def _scrubbed(res: dict) -> dict:
+    # an extraction result with its text run through scrub_pii, and the counts
+    text, redactions = scrub_pii(res["text"])
+    return dict(res, text=text, redactions=redactions)
+
+
+# PII scrubbing. Lines mentioning any of _PII_TAGS are dropped (as before);
+# emails, phone numbers, URLs and full dates are replaced by placeholders.
+# Every alternative of _PII_PATTERN starts with one of a few trigger
+# characters, so the regex engine skips plain prose with a C-level charset
+# scan and Python only sees actual candidates. Left context the pattern
+# cannot consume (email local part, URL scheme, leading month name) is
+# checked in scrub_pii.
+_PII_TAGS = ("name:", "gender:", "age:", "address:")
+# part of the PDF cache key: bump when scrub_pii output changes so cached text is re-scrubbed
+PII_SCRUBBER_VERSION = 1
+_PII_TOKENS = {"email": "[EMAIL]", "phone": "[PHONE]", "url": "[URL]", "date": "[DATE]"}
+_MONTH = r"(?i:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[A-Za-z]*\.?"
+_PII_PATTERN = re.compile(
+    r"[@:.+(0-9](?:"
+    r"(?<=@)(?P<email>[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)"
+    r"|(?<=:)(?P<url>//[^\s<>\"']+)"
+    r"|(?<=\.)(?P<host>(?:[A-Za-z0-9-]+\.)*[A-Za-z]{2,}(?:/[^\s<>\"']*)?)"
+    # digit triggers only at the start of a number
+    r"|(?<![0-9A-Za-z].)(?<=[0-9])(?:"
+    r"(?P<date>[0-9]{0,3}[/.-][0-9]{1,2}[/.-][0-9]{2,4}(?![0-9])"
+    r"|[0-9]?(?:st|nd|rd|th)?\s+" + _MONTH + r",?\s+[0-9]{4}(?![0-9]))"
+    r"|(?P<month_date>[0-9]?(?:st|nd|rd|th)?,?\s+[0-9]{4}(?![0-9]))"
+    r"|(?P<phone>[0-9]{0,3}\)?(?:[ .-]?\(?[0-9]{2,4}\)?){2,5}(?![0-9]))"
+    r")"
+    r"|(?<=[+(])(?P<intl_phone>[0-9]{1,4}\)?(?:[ .-]?\(?[0-9]{2,4}\)?){2,5}(?![0-9]))"
+    r")"
+)
+_EMAIL_LOCAL = re.compile(r"[A-Za-z0-9._%+-]+$")
+_URL_SCHEME = re.compile(r"(?i:https?|ftp)$")
+_HOST_WORD = re.compile(r"[A-Za-z0-9-]+$")
+# a bare host (no scheme, no www.) is only a URL on sites whose paths name a
+# person; "React.js/Redux", "python.org/docs" or "docker.io/library/python" are
+# tech phrasing whose skill words must survive scrubbing
+_PROFILE_HOSTS = frozenset({
+    "linkedin.com", "github.com", "gitlab.com", "bitbucket.org", "twitter.com", "x.com", "medium.com",
+    "stackoverflow.com", "kaggle.com", "behance.net", "dribbble.com", "about.me",
+})
+# punctuation that ends a sentence rather than a URL
+_URL_TRAILING = ".,;:!?)]}"
+_MONTH_BEFORE = re.compile(_MONTH + r"\s*$")
+_PHONE_PREFIX = re.compile(r"(?:\+\s?)?\(?$")
+_DATE_PARTS = re.compile(r"[/.-]")
+_OTHER_LINE_BREAKS = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _left_extent(regex, text: str, start: int, floor: int, window: int = 64) -> Optional[int]:
+    # start of the run matching regex that ends exactly at start (not reaching before floor)
+    m = regex.search(text, max(floor, start - window), start)
+    return m.start() if m else None
+
+
+def _starts_token(text: str, start: int, floor: int) -> bool:
+    return start == floor or not text[start - 1].isalnum()
+
+
+def _is_profile_host(host: str) -> bool:
+    host = host.lower()
+    return any(host == h or host.endswith("." + h) for h in _PROFILE_HOSTS)
+
+
+def _valid_date(span: str) -> bool:
+    parts = _DATE_PARTS.split(span)
+    if len(parts) != 3 or not all(p.isdigit() for p in parts):
+        return True  # "4th July 1990"
+    a, b, c = (int(p) for p in parts)
+    if len(parts[0]) == 4:
+        return 1 <= b <= 12 and 1 <= c <= 31
+    return len(parts[0]) <= 2 and 1 <= a <= 31 and 1 <= b <= 31 and min(a, b) <= 12 and len(parts[2]) in (2, 4)
+
+
+def _phone_span(span: str) -> Optional[str]:
+    # 10-15 digits; a run swallowing trailing numbers is cut back group by group
+    digits = sum(c.isdigit() for c in span)
+    while digits > 15:
+        cut = max(span.rfind(" "), span.rfind("."), span.rfind("-"))
+        if cut <= 0:
+            return None
+        span = span[:cut]
+        digits = sum(c.isdigit() for c in span)
+    return span if digits >= 10 else None
+
+
+def _drop_tag_lines(text: str, counts: Dict[str, int]) -> str:
+    low = text.lower()
+    if not any(tag in low for tag in _PII_TAGS):
+        return text
+    if len(low) != len(text) or _OTHER_LINE_BREAKS.search(text):
+        # rare: lowercasing changed offsets, or splitlines() would see extra breaks
+        kept = []
+        for ln in text.splitlines():
+            if any(tag in ln.lower() for tag in _PII_TAGS):
+                counts["line"] += 1
+            else:
+                kept.append(ln)
+        return "\n".join(kept)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        low = text.lower()
+    spans = []
+    for tag in _PII_TAGS:
+        i = low.find(tag)
+        while i != -1:
+            end = text.find("\n", i)
+            end = len(text) if end == -1 else end
+            spans.append((text.rfind("\n", 0, i) + 1, end))
+            i = low.find(tag, end)
+    parts, prev = [], 0
+    for start, end in sorted(spans):
+        if start < prev:
+            continue  # same line, several tags
+        counts["line"] += 1
+        parts.append(text[prev:start])
+        prev = end
+    parts.append(text[prev:])
+    return "".join(parts)
+
+
+def scrub_pii(text: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Redact PII in one scan and collapse whitespace. Returns the scrubbed text
+    and how many lines were dropped and emails, phones, URLs and dates replaced.
+    """
+    counts = {"line": 0, "email": 0, "phone": 0, "url": 0, "date": 0}
     if not text:
-        return ""
-    # Remove common PII lines
-    lines = text.splitlines()
-    filtered = []
-    for ln in lines:
-        low = ln.lower()
-        if any(tag in low for tag in ["name:", "gender:", "age:", "address:"]):
+        return "", counts
+    text = _drop_tag_lines(text, counts)
+    out, prev, pos = [], 0, 0
+    search = _PII_PATTERN.search
+    while True:
+        m = search(text, pos)
+        if m is None:
+            break
+        kind, start, end = m.lastgroup, m.start(), m.end()
+        label = None
+        if kind == "email":
+            left = _left_extent(_EMAIL_LOCAL, text, start, prev)
+            if left is not None:
+                start, label = left, "email"
+        elif kind == "url":
+            left = _left_extent(_URL_SCHEME, text, start, prev, 8)
+            if left is not None and _starts_token(text, left, prev):
+                start, label = left, "url"
+        elif kind == "host":
+            # www.example.com, or a profile link (linkedin.com/in/...)
+            left = _left_extent(_HOST_WORD, text, start, prev)
+            if left is not None and _starts_token(text, left, prev) and text[left - 1:left] not in ("@", "."):
+                host, slash, _ = m.group("host").partition("/")
+                if text[left:start].lower() == "www" or (slash and _is_profile_host(f"{text[left:start]}.{host}")):
+                    start, label = left, "url"
+        elif kind == "date":
+            if _valid_date(text[start:end]):
+                label = "date"
+        elif kind == "month_date":
+            left = _left_extent(_MONTH_BEFORE, text, start, prev, 16)
+            if left is not None and (left == prev or not text[left - 1].isalpha()):
+                start, label = left, "date"
+        else:
+            left = _left_extent(_PHONE_PREFIX, text, start, prev, 3)
+            if left is not None:
+                start = left
+            span = _phone_span(text[start:end])
+            if span:
+                end, label = start + len(span), "phone"
+        if label is None:
+            pos = m.start() + 1
             continue
-        filtered.append(ln)
-    out = "\n".join(filtered)
-    # collapse whitespace
-    out = re.sub(r"\s+", " ", out).strip()
-    return out
+        if label == "url":
+            end = start + len(text[start:end].rstrip(_URL_TRAILING))
+        counts[label] += 1
+        out.append(text[prev:start])
+        out.append(_PII_TOKENS[label])
+        prev = pos = end
+    out.append(text[prev:])
+    # collapse whitespace (str.split uses the same whitespace set as \s)
+    return " ".join("".join(out).split()), counts
+
+
+def sanitize_text(text: str) -> str:
+    return scrub_pii(text)[0]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+# taxonomies up to this many distinct skills are matched with one regex; the
+# alternation is tried per position, so larger ones use the Aho-Corasick automaton
+SKILL_REGEX_MAX = 200
+
+
+class SkillMatcher:
+    """Whole-word matcher over a skill list.
+
+    Every skill that occurs as a whole word is reported, so "ai" does not match
+    inside "maintain" nor "ml" inside "html", while overlapping skills
+    ("machine learning" and "learning") are all found. Small taxonomies use one
+    precompiled regex with longest-first alternation; larger ones (more than
+    SKILL_REGEX_MAX skills) fall back to an Aho-Corasick automaton that makes a
+    single pass over the text whatever the taxonomy size.
+    """
+
+    def __init__(self, skills: List[str]):
+        self.skills = list(skills)
+        self._lengths = [len(s) for s in self.skills]
+        by_key = {}
+        for idx, skill in enumerate(self.skills):
+            if skill:
+                by_key.setdefault(skill.lower(), []).append(idx)
+        self._use_regex = len(by_key) <= SKILL_REGEX_MAX
+        if self._use_regex:
+            self._build_regex(by_key)
+        else:
+            self._build_automaton()
+
+    def _build_regex(self, by_key: Dict[str, List[int]]):
+        # the lookahead reports the longest skill at each start without consuming
+        # it, so skills starting later inside a match are still found; shorter
+        # skills ending at a non-word character inside it matched there too
+        keys = sorted(by_key, key=len, reverse=True)
+        hits = {}
+        for key in keys:
+            idxs = list(by_key[key])
+            for j in range(1, len(key)):
+                if not _is_word_char(key[j]) and key[:j] in by_key:
+                    idxs += by_key[key[:j]]
+            hits[key] = idxs
+        self._hits = hits
+        self._pattern = re.compile(r"(?<!\w)(?=(" + "|".join(map(re.escape, keys)) + r")(?!\w))") if keys else None
+
+    def _build_automaton(self):
+        goto = [{}]
+        out = [[]]
+        for idx, skill in enumerate(self.skills):
+            if not skill:
+                continue
+            node = 0
+            for ch in skill.lower():
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(idx)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def find(self, text: str) -> List[str]:
+        t = text.lower()
+        found = set()
+        if self._use_regex:
+            if self._pattern is not None:
+                hits = self._hits
+                for key in self._pattern.findall(t):
+                    found.update(hits[key])
+            return sorted(self.skills[idx] for idx in found)
+        n = len(t)
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        root = goto[0]
+        node = 0
+        for i, ch in enumerate(t):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0) if node else root.get(ch, 0)
+            if not out[node]:
+                continue
+            end_ok = i + 1 == n or not _is_word_char(t[i + 1])
+            if not end_ok:
+                continue
+            for idx in out[node]:
+                start = i - lengths[idx] + 1
+                if start == 0 or not _is_word_char(t[start - 1]):
+                    found.add(idx)
+        return sorted(self.skills[idx] for idx in found)
+
+
+@lru_cache(maxsize=32)
+def get_skill_matcher(skills: Tuple[str, ...]) -> SkillMatcher:
+    return SkillMatcher(list(skills))
 
 
 def extract_skills(text: str, skills_list: List[str] = None) -> List[str]:
     if skills_list is None:
         skills_list = DEFAULT_SKILLS
-    t = text.lower()
-    found = []
-    for s in skills_list:
-        if s in t:
-            found.append(s)
-    return sorted(found)
+    return get_skill_matcher(tuple(skills_list)).find(text or "")
 
 
 def extract_experience_years(text: str) -> float:
@@ -119,7 +1104,7 @@ def extract_project_count(text: str) -> int:
     return text.lower().count("project")
 
 
-def make_txt_report(record: dict, agentfacts: dict) -> str:
+def make_txt_report(record: dict, agentfacts: dict, proof: dict = None) -> str:
     parts = []
     parts.append(f"Candidate: {record.get('name')}")
     parts.append(f"Date: {now_iso()}")
@@ -130,9 +1115,24 @@ def make_txt_report(record: dict, agentfacts: dict) -> str:
     parts.append(f"Decision: {record.get('decision')}")
     parts.append("\nExplanation:")
     parts.append(record.get('reasoning', ''))
+    if record.get('redactions'):
+        parts.append("\nPII removed before scoring:")
+        for k, v in record['redactions'].items():
+            parts.append(f" - {k}: {v}")
     parts.append("\nPolicy checks:")
     for k, v in agentfacts.get('policy_checks', {}).items():
         parts.append(f" - {k}: {v}")
+    if record.get('signature'):
+        parts.append(f"Record signature: {record['signature']}")
     parts.append(f"Merkle root: {agentfacts.get('merkle_root')}")
     parts.append(f"Signature: {agentfacts.get('signature')}")
+    if proof:
+        parts.append("\nInclusion proof:")
+        if 'segment' in proof:
+            parts.append(f" - sealed segment: {proof['segment']} (root {proof.get('segment_root')})")
+        parts.append(f" - leaf index: {proof.get('index')} of {proof.get('leaf_count')}")
+        parts.append(f" - leaf: {json.dumps(proof.get('leaf'), sort_keys=True)}")
+        for step in proof.get('path', []):
+            parts.append(f" - {step['side']}: {step['hash']}")
+        parts.append(f" - verified: {'yes' if proof.get('verified') else 'no'}")
     return "\n".join(parts)